@@ -3,9 +3,20 @@ from translator import Translator
 from config import Config
 from typing import Dict, List
 
+@st.cache_resource
+def get_translator() -> Translator:
+    """
+    Build the translator once per server process
+    
+    Streamlit reruns this script on every interaction; sharing one instance
+    keeps the hedging latency histograms, the concurrency limit and the
+    open phrase index / translation memory alive across reruns and sessions.
+    """
+    return Translator()
+
 # Initialize the translator with PALM API
 try:
-    translator = Translator()
+    translator = get_translator()
     # Display model information in sidebar
     model_info = translator.get_model_info()
 except Exception as e:
@@ -54,6 +65,11 @@ def translation_interface():
         st.info(f"**API Status:** {model_info['api_status']}")
         st.info(f"**Translation Model:** {model_info['translation_model']}")
         st.info(f"**Travel Model:** {model_info['travel_model']}")
+        concurrency = translator.get_concurrency_metrics()
+        st.info(
+            f"**Concurrency Limit:** {concurrency['limit']} "
+            f"({sum(concurrency['queue_depth'].values())} queued)"
+        )
         
         st.markdown("---")
         
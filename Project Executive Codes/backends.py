@@ -0,0 +1,320 @@
+"""
+Translation backends for TransLingua application
+Separates the Translator from the service that actually produces translations
+"""
+
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from concurrency import INTERACTIVE, AdaptiveLimiter
+from config import Config
+from hedging import HedgingPolicy
+from phrase_table import PhraseIndex
+from translation_memory import TranslationMemory, primary_language
+
+
+def build_translation_prompt(
+    text: str,
+    source_lang: str,
+    target_lang: str,
+    context: Optional[str] = None
+) -> str:
+    """
+    Build the LLM prompt for a single translation request
+
+    Args:
+        text: Text to translate
+        source_lang: Source language name
+        target_lang: Target language name
+        context: Optional context for better translation
+
+    Returns:
+        Prompt text
+    """
+    if context:
+        return f"""
+            Translate the following text from {source_lang} to {target_lang}.
+            Context: {context}
+            Provide only the translation without any additional explanations or formatting.
+            Maintain the original tone, style, and context of the text.
+
+            Text to translate: {text}
+
+            Translation:
+            """
+
+    return f"""
+        Translate the following text from {source_lang} to {target_lang}.
+        Provide only the translation without any additional explanations or formatting.
+        Maintain the original tone, style, and context of the text.
+
+        Text to translate: {text}
+
+        Translation:
+        """
+
+
+class TranslationBackend(ABC):
+    """Base class for anything that can answer a translation request"""
+
+    name = "backend"
+
+    @abstractmethod
+    def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Translate text
+
+        Args:
+            text: Text to translate
+            source_lang: Source language name
+            target_lang: Target language name
+            context: Optional context for better translation
+
+        Returns:
+            Translated text, or None if this backend has no answer
+        """
+
+
+class GeminiBackend(TranslationBackend):
+    """Backend that sends every request to a Google GenAI model"""
+
+    name = "gemini"
+
+    def __init__(
+        self,
+        client,
+        model_name: str,
+        hedging: Optional[HedgingPolicy] = None,
+        limiter: Optional[AdaptiveLimiter] = None
+    ):
+        """
+        Args:
+            client: genai.Client instance
+            model_name: Model used for generate_content calls
+            hedging: Optional policy for racing duplicate requests on slow calls
+            limiter: Optional adaptive limit on in-flight calls
+        """
+        self.client = client
+        self.model_name = model_name
+        self.hedging = hedging
+        self.limiter = limiter
+
+    def generate(
+        self,
+        prompt: str,
+        cached_content: Optional[str] = None,
+        method: str = "generate",
+        lane: str = INTERACTIVE
+    ) -> str:
+        """
+        Run a free-form prompt through the model
+
+        Args:
+            prompt: Prompt text
+            cached_content: Optional cache name whose contents prefix the prompt
+            method: Caller name; latency for hedging is tracked per method
+            lane: Concurrency lane, INTERACTIVE or BULK
+
+        Returns:
+            Stripped response text
+        """
+        config = {"cached_content": cached_content} if cached_content else None
+
+        def request():
+            return self.client.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=config
+            )
+
+        if self.hedging:
+            # Hedged duplicates take a limiter slot too, and are only sent
+            # while the limiter has room for them
+            response = self.hedging.call(
+                method,
+                request,
+                slot=(lambda: self.limiter.slot(lane, method)) if self.limiter else None,
+                may_hedge=(lambda: self.limiter.has_free_slot(lane)) if self.limiter else None
+            )
+        elif self.limiter:
+            with self.limiter.slot(lane, method):
+                response = request()
+        else:
+            response = request()
+        return response.text.strip()
+
+    def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> Optional[str]:
+        return self.generate(
+            build_translation_prompt(text, source_lang, target_lang, context),
+            method="translate_text"
+        )
+
+
+class PhraseTableBackend(TranslationBackend):
+    """Offline backend serving exact hits from a phrase index"""
+
+    name = "phrase_table"
+
+    def __init__(
+        self,
+        index: PhraseIndex,
+        min_similarity: float = 1.0
+    ):
+        """
+        Args:
+            index: Memory-mapped phrase index
+            min_similarity: Minimum similarity for closest_match; translate
+                also serves fuzzy hits when this is below 1.0, which is only
+                safe where the caller labels them as approximate
+        """
+        self.index = index
+        self.min_similarity = min_similarity
+
+    def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> Optional[str]:
+        # Stored segments were translated without the caller's context,
+        # so they cannot honour it
+        if context:
+            return None
+
+        source_code = primary_language(source_lang)
+        target_code = primary_language(target_lang)
+
+        hit = self.index.lookup(text, source_code, target_code)
+        if hit is not None or self.min_similarity >= 1.0:
+            return hit
+
+        match = self.closest_match(text, source_lang, target_lang)
+        return match[0] if match else None
+
+    def closest_match(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Translation of the most similar stored segment
+
+        Args:
+            text: Source text
+            source_lang: Source language name
+            target_lang: Target language name
+
+        Returns:
+            (translation, similarity) of a segment at least min_similarity
+            alike, or None
+        """
+        return self.index.fuzzy_lookup(
+            text,
+            primary_language(source_lang),
+            primary_language(target_lang),
+            self.min_similarity
+        )
+
+
+class TranslationMemoryBackend(TranslationBackend):
+    """Offline backend serving exact hits from the translation memory"""
+
+    name = "translation_memory"
+
+    def __init__(self, memory: TranslationMemory):
+        """
+        Args:
+            memory: Translation memory store
+        """
+        self.memory = memory
+
+    def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> Optional[str]:
+        if context:
+            return None
+        return self.memory.lookup(text, source_lang, target_lang)
+
+
+class MemoryWriteBackend(TranslationBackend):
+    """Wraps a backend and records its translations in the translation memory"""
+
+    name = "memory_write"
+
+    def __init__(self, backend: TranslationBackend, memory: TranslationMemory):
+        """
+        Args:
+            backend: Backend producing the translations
+            memory: Translation memory store to record them in
+        """
+        self.backend = backend
+        self.memory = memory
+
+    def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> Optional[str]:
+        result = self.backend.translate(text, source_lang, target_lang, context)
+        if result is not None and not context:
+            try:
+                self.memory.add(source_lang, target_lang, text, result)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not record translation in memory: {str(e)}")
+        return result
+
+
+class ChainBackend(TranslationBackend):
+    """Consults backends in order and returns the first answer"""
+
+    name = "chain"
+
+    def __init__(self, backends: List[TranslationBackend]):
+        """
+        Args:
+            backends: Backends in the order they should be consulted
+        """
+        self.backends = backends
+
+    def translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> Optional[str]:
+        # A failing backend (e.g. no network) escalates to the next one; the
+        # error only surfaces if nothing later in the chain can answer
+        last_error = None
+        for backend in self.backends:
+            try:
+                result = backend.translate(text, source_lang, target_lang, context)
+            except Exception as e:
+                last_error = e
+                continue
+            if result is not None:
+                return result
+
+        if last_error is not None:
+            raise last_error
+        return None
@@ -0,0 +1,266 @@
+"""
+Record/replay transport for TransLingua application
+Stands in for genai.Client so the Translator can run without network access
+
+Set TRANSLINGUA_CASSETTE_MODE=record to capture live responses, then
+TRANSLINGUA_CASSETTE_MODE=replay to serve them back offline (no API key
+needed). TRANSLINGUA_CASSETTE_LATENCY=recorded replays the original
+response times; a number replays a fixed delay in milliseconds.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+import google.genai as genai
+from config import Config
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when no recording matches a request"""
+
+
+class CassetteResponse:
+    """Minimal stand-in for a GenerateContentResponse"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CassetteCache:
+    """Minimal stand-in for a CachedContent resource"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+def _digest(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def normalize_prompt(prompt) -> str:
+    """Collapse whitespace so prompt indentation changes do not break replay"""
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt, sort_keys=True, ensure_ascii=False, default=str)
+    return _WHITESPACE_RE.sub(" ", prompt).strip()
+
+
+class Cassette:
+    """
+    Gzipped JSON-lines file of recorded responses keyed by request hash
+
+    New recordings are appended as separate gzip members, so a crashed run
+    keeps everything recorded before it. A file cut off mid-write loads the
+    entries before the damage, and the next recording rewrites it cleanly.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Cassette file path
+        """
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._damaged = False
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    if not line.endswith("\n"):
+                        raise EOFError("last recording is incomplete")
+                    entry = json.loads(line)
+                    self._entries[entry["key"]] = entry
+        except (EOFError, gzip.BadGzipFile, zlib.error, UnicodeDecodeError, ValueError, KeyError) as e:
+            self._damaged = True
+            print(
+                f"⚠️ Cassette {self.path} is damaged ({str(e)}); "
+                f"using the {len(self._entries)} recordings before the damage"
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def put(self, key: str, text: str, latency_ms: float):
+        entry = {"key": key, "text": text, "latency_ms": round(latency_ms, 1)}
+        with self._lock:
+            self._entries[key] = entry
+            if self._damaged:
+                # Appending after a broken member would hide the new entry
+                # from every later load, so start the file over
+                self._rewrite()
+                return
+            with gzip.open(self.path, "at", encoding="utf-8") as handle:
+                handle.write(_entry_line(entry))
+
+    def _rewrite(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".cassette-")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as handle:
+                for entry in self._entries.values():
+                    handle.write(_entry_line(entry))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._damaged = False
+
+
+def _entry_line(entry: dict) -> str:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class _Models:
+    def __init__(self, client: "CassetteClient"):
+        self._client = client
+
+    def generate_content(self, model: str, contents, config=None):
+        return self._client._generate_content(model, contents, config)
+
+
+class _Caches:
+    def __init__(self, client: "CassetteClient"):
+        self._client = client
+
+    def create(self, model: str, config):
+        return self._client._create_cache(model, config)
+
+    def update(self, name: str, config):
+        if self._client.mode == "record":
+            self._client.client.caches.update(name=name, config=config)
+
+    def delete(self, name: str):
+        if self._client.mode == "record":
+            self._client.client.caches.delete(name=name)
+
+
+class CassetteClient:
+    """
+    genai.Client look-alike that records or replays model responses
+
+    Requests are keyed by model, normalized prompt, generation config and
+    the content of any cached prefix (cache names differ between runs, so
+    the content digest is used instead).
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        mode: str,
+        client=None,
+        latency: Optional[str] = None
+    ):
+        """
+        Args:
+            cassette: Cassette to read from / write to
+            mode: "record" or "replay"
+            client: Real genai.Client (record mode only)
+            latency: Replay delay: None, "recorded", or milliseconds
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and client is None:
+            raise ValueError("Record mode needs a live genai.Client")
+
+        self.cassette = cassette
+        self.mode = mode
+        self.client = client
+        self.latency = latency
+        self.models = _Models(self)
+        self.caches = _Caches(self)
+        self._cache_digests: Dict[str, str] = {}
+
+    def _request_key(self, model: str, contents, config) -> str:
+        config = dict(config or {})
+        cached_name = config.pop("cached_content", None)
+        cached_digest = self._cache_digests.get(cached_name, cached_name or "")
+        return _digest(
+            model,
+            normalize_prompt(contents),
+            json.dumps(config, sort_keys=True, default=str),
+            cached_digest
+        )
+
+    def _replay_delay(self, entry: dict):
+        if not self.latency:
+            return
+        if self.latency == "recorded":
+            time.sleep(entry.get("latency_ms", 0) / 1000)
+        else:
+            time.sleep(float(self.latency) / 1000)
+
+    def _generate_content(self, model: str, contents, config):
+        key = self._request_key(model, contents, config)
+
+        if self.mode == "replay":
+            entry = self.cassette.get(key)
+            if entry is None:
+                raise CassetteMissError(
+                    f"No recording for this {model} request in {self.cassette.path}; "
+                    "re-run with TRANSLINGUA_CASSETTE_MODE=record"
+                )
+            self._replay_delay(entry)
+            return CassetteResponse(entry["text"])
+
+        started = time.monotonic()
+        response = self.client.models.generate_content(model=model, contents=contents, config=config)
+        self.cassette.put(key, response.text, (time.monotonic() - started) * 1000)
+        return response
+
+    def _create_cache(self, model: str, config):
+        config = dict(config or {})
+        digest = _digest(
+            model,
+            normalize_prompt(config.get("contents")),
+            normalize_prompt(config.get("system_instruction") or "")
+        )
+
+        if self.mode == "replay":
+            name = f"cachedContents/replay-{digest[:16]}"
+            cached = CassetteCache(name)
+        else:
+            cached = self.client.caches.create(model=model, config=config)
+            name = cached.name
+        self._cache_digests[name] = digest
+        return cached
+
+
+def create_client(api_key: Optional[str]):
+    """
+    Build the client the Translator talks to
+
+    Args:
+        api_key: Google API key (not needed in replay mode)
+
+    Returns:
+        genai.Client, or a CassetteClient when a cassette mode is configured
+    """
+    mode = Config.CASSETTE_MODE
+    if not mode:
+        return genai.Client(api_key=api_key)
+
+    cassette = Cassette(Config.CASSETTE_PATH)
+    if mode == "replay":
+        return CassetteClient(cassette, mode, latency=Config.CASSETTE_LATENCY)
+    return CassetteClient(cassette, mode, client=genai.Client(api_key=api_key))
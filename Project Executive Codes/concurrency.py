@@ -0,0 +1,219 @@
+"""
+Adaptive concurrency control for TransLingua application
+Limits in-flight model calls with an AIMD (additive increase, multiplicative
+decrease) policy driven by observed latency and overload errors
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from config import Config
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """
+    Whether an exception signals that upstream is overloaded
+
+    Quota errors (HTTP 429 / RESOURCE_EXHAUSTED) and timeouts shrink the
+    limit; other failures, such as invalid requests, say nothing about load.
+    """
+    if isinstance(error, TimeoutError):
+        return True
+    for attribute in ("code", "status_code"):
+        if getattr(error, attribute, None) == 429:
+            return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "timed out" in message.lower()
+
+
+class LatencyBaseline:
+    """Short- and long-term latency averages (EWMA) for one method"""
+
+    def __init__(self):
+        self.short: Optional[float] = None
+        self.long: Optional[float] = None
+
+    def observe(self, latency: float):
+        """Fold one successful call's latency into both averages"""
+        if self.short is None:
+            self.short = self.long = latency
+            return
+        self.short += Config.CONCURRENCY_SHORT_ALPHA * (latency - self.short)
+        self.long += Config.CONCURRENCY_LONG_ALPHA * (latency - self.long)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limiter for outbound requests with interactive and bulk lanes
+
+    While calls succeed at a steady latency and the limit is actually being
+    used, the limit grows by about one per limit's worth of completions.
+    A 429, a timeout, or short-term latency rising well above the long-term
+    baseline cuts it multiplicatively, at most once per round trip. Latency
+    is averaged per method, like the hedging histograms, so a burst of slow
+    calls (documents) is not mistaken for overload of fast ones.
+
+    Waiting interactive callers are always admitted before bulk ones, and
+    bulk work may only fill part of the limit so an interactive request
+    arriving later normally finds a free slot.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = Config.CONCURRENCY_INITIAL_LIMIT,
+        min_limit: int = Config.CONCURRENCY_MIN_LIMIT,
+        max_limit: int = Config.CONCURRENCY_MAX_LIMIT,
+        backoff: float = Config.CONCURRENCY_BACKOFF,
+        latency_tolerance: float = Config.CONCURRENCY_LATENCY_TOLERANCE,
+        bulk_share: float = Config.CONCURRENCY_BULK_SHARE
+    ):
+        """
+        Args:
+            initial_limit: Starting number of in-flight calls allowed
+            min_limit: Floor for the limit
+            max_limit: Ceiling for the limit
+            backoff: Factor the limit is multiplied by on overload
+            latency_tolerance: Short/long latency ratio treated as overload
+            bulk_share: Fraction of the limit the bulk lane may occupy
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.bulk_share = bulk_share
+
+        self._limit = float(initial_limit)
+        self._in_flight = {lane: 0 for lane in LANES}
+        self._waiting = {lane: 0 for lane in LANES}
+        self._baselines: Dict[str, LatencyBaseline] = {}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of in-flight calls allowed"""
+        return int(self._limit)
+
+    def metrics(self) -> Dict[str, object]:
+        """
+        Snapshot of the limiter state
+
+        Returns:
+            Current limit, in-flight and queued calls per lane, and the
+            short/long latency averages in seconds per method
+        """
+        with self._condition:
+            return {
+                "limit": int(self._limit),
+                "in_flight": dict(self._in_flight),
+                "queue_depth": dict(self._waiting),
+                "latency": {
+                    method: {"short": baseline.short, "long": baseline.long}
+                    for method, baseline in self._baselines.items()
+                }
+            }
+
+    def has_free_slot(self, lane: str = INTERACTIVE) -> bool:
+        """Whether a call in the lane would start now rather than queue"""
+        with self._condition:
+            return not self._waiting[lane] and self._can_admit(lane)
+
+    def _can_admit(self, lane: str) -> bool:
+        total = sum(self._in_flight.values())
+        limit = int(self._limit)
+        if total >= limit:
+            return False
+        if lane == INTERACTIVE:
+            return True
+        if self._waiting[INTERACTIVE]:
+            return False
+        return self._in_flight[BULK] < self._bulk_limit()
+
+    def _bulk_limit(self) -> int:
+        return max(1, int(int(self._limit) * self.bulk_share))
+
+    def acquire(self, lane: str = INTERACTIVE) -> float:
+        """
+        Block until a slot is free in the given lane
+
+        Returns:
+            Start time to pass back to release
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown concurrency lane: {lane}")
+        with self._condition:
+            self._waiting[lane] += 1
+            try:
+                while not self._can_admit(lane):
+                    self._condition.wait()
+            finally:
+                self._waiting[lane] -= 1
+            self._in_flight[lane] += 1
+        return time.monotonic()
+
+    def release(
+        self,
+        lane: str,
+        started: float,
+        error: Optional[BaseException] = None,
+        method: str = "generate"
+    ):
+        """
+        Free a slot and feed the outcome into the limit
+
+        Args:
+            lane: Lane the slot was acquired in
+            started: Value returned by acquire
+            error: Exception raised by the call, if any
+            method: Name the latency baseline is kept under
+        """
+        latency = time.monotonic() - started
+        with self._condition:
+            # Only grow when the limit is what held callers back
+            utilised = (
+                sum(self._in_flight.values()) >= int(self._limit)
+                or (lane == BULK and self._in_flight[BULK] >= self._bulk_limit())
+            )
+            self._in_flight[lane] -= 1
+            baseline = self._baselines.setdefault(method, LatencyBaseline())
+
+            if error is not None:
+                if is_overload_error(error):
+                    self._decrease(baseline)
+            else:
+                baseline.observe(latency)
+                if baseline.long and baseline.short > baseline.long * self.latency_tolerance:
+                    self._decrease(baseline)
+                elif utilised:
+                    self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, lane: str = INTERACTIVE, method: str = "generate") -> Iterator[None]:
+        """Context manager around acquire/release"""
+        started = self.acquire(lane)
+        try:
+            yield
+        except BaseException as e:
+            self.release(lane, started, e, method)
+            raise
+        self.release(lane, started, method=method)
+
+    def _decrease(self, baseline: LatencyBaseline):
+        # Responses already in flight reflect the old limit; only back off
+        # once per round trip (of the method that saw the overload) so one
+        # burst of errors is not counted twice
+        now = time.monotonic()
+        if now - self._last_decrease < (baseline.short or 0):
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        # Re-anchor the short average so the new limit gets a fair hearing
+        if baseline.long is not None:
+            baseline.short = baseline.long
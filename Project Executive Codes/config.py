@@ -51,9 +51,63 @@ class Config:
     # Translation History
     MAX_HISTORY_ITEMS = 10
     
+    # Local Phrase Table (consulted before the LLM)
+    PHRASE_INDEX_PATH = os.getenv("TRANSLINGUA_PHRASE_INDEX", "phrase_index.tsv")
+    # A similar segment's translation is never served as the translation
+    # (one digit or a "not" changes the meaning); matches at least this
+    # similar are only shown as labelled suggestions
+    SUGGESTION_MATCH_THRESHOLD = 0.75
+    # Share of a text's trigrams a fuzzy candidate must have in common when
+    # the similarity threshold is too low to imply a stricter bound
+    FUZZY_MIN_SHARED_GRAMS = 0.5
+    
+    # Translation Memory (set TRANSLINGUA_TRANSLATION_MEMORY="" to disable)
+    TRANSLATION_MEMORY_PATH = os.getenv("TRANSLINGUA_TRANSLATION_MEMORY", "translation_memory.db")
+    TM_BATCH_SIZE = 10000
+    
+    # Context Caching (shared prefixes for refinement and document jobs)
+    CONTEXT_CACHE_TTL_SECONDS = 600
+    CONTEXT_CACHE_MIN_CHARS = 8000
+    DOCUMENT_CHUNK_CHARS = 4000
+    
+    # Locale Bundle Sync (in-flight calls are governed by the adaptive limiter)
+    I18N_BATCH_SIZE = 40
+    I18N_MAX_WORKERS = 32
+    
+    # Request Hedging (opt-in: set TRANSLINGUA_HEDGING=1)
+    HEDGING_ENABLED = os.getenv("TRANSLINGUA_HEDGING", "").lower() in ("1", "true", "yes")
+    HEDGE_PERCENTILE = 95
+    HEDGE_BUDGET_PERCENT = 5
+    HEDGE_BUDGET_WINDOW = 1000
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_WINDOW_SIZE = 500
+    # Room for a primary and a hedge per sync worker, so hedged calls
+    # never queue behind each other for a thread
+    HEDGE_MAX_WORKERS = 2 * I18N_MAX_WORKERS
+    
+    # Adaptive Concurrency (AIMD limit on in-flight model calls)
+    CONCURRENCY_INITIAL_LIMIT = 4
+    CONCURRENCY_MIN_LIMIT = 1
+    CONCURRENCY_MAX_LIMIT = 64
+    CONCURRENCY_BACKOFF = 0.7
+    CONCURRENCY_LATENCY_TOLERANCE = 1.5
+    CONCURRENCY_BULK_SHARE = 0.8
+    CONCURRENCY_SHORT_ALPHA = 0.3
+    CONCURRENCY_LONG_ALPHA = 0.02
+    
+    # Record/Replay (TRANSLINGUA_CASSETTE_MODE=record|replay, unset for live calls)
+    CASSETTE_MODE = os.getenv("TRANSLINGUA_CASSETTE_MODE", "").lower()
+    CASSETTE_PATH = os.getenv("TRANSLINGUA_CASSETTE", "translingua_cassette.jsonl.gz")
+    CASSETTE_LATENCY = os.getenv("TRANSLINGUA_CASSETTE_LATENCY") or None
+    
+    @classmethod
+    def language_code(cls, language: str) -> str:
+        """Map a language name to its code; codes pass through unchanged"""
+        return cls.LANGUAGES.get(language, language)
+    
     @classmethod
     def validate_config(cls):
         """Validate configuration settings"""
-        if not cls.GOOGLE_API_KEY:
+        if not cls.GOOGLE_API_KEY and cls.CASSETTE_MODE != "replay":
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
         return True
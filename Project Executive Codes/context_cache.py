@@ -0,0 +1,217 @@
+"""
+Context caching for TransLingua application
+Manages upstream cached-content handles for large shared prompt prefixes
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from config import Config
+
+
+class _CacheEntry:
+    """Bookkeeping for one upstream cached-content resource"""
+
+    def __init__(self, name: Optional[str] = None, expires_at: float = 0.0):
+        self.name = name
+        self.expires_at = expires_at
+        self.refcount = 0
+        self.renewing = False
+        # Set once the create call has finished, successfully or not
+        self.ready = threading.Event()
+
+    @property
+    def failed(self) -> bool:
+        return self.ready.is_set() and self.name is None
+
+
+class ContextCache:
+    """
+    Reference-counted handles to Google GenAI cached content
+
+    Identical prefixes (same model, system instruction and contents) share a
+    single upstream cache. Handles stay alive for their TTL after the last
+    release so that follow-up calls, such as further refinement rounds, can
+    reuse them; a handle whose TTL runs low while still in use is extended.
+    A failed create is remembered for one TTL as well, so a prefix the API
+    rejects is not retried on every call.
+    """
+
+    def __init__(
+        self,
+        client,
+        model_name: str,
+        ttl_seconds: int = Config.CONTEXT_CACHE_TTL_SECONDS,
+        min_chars: int = Config.CONTEXT_CACHE_MIN_CHARS
+    ):
+        """
+        Args:
+            client: genai.Client instance
+            model_name: Model the cached content is created for
+            ttl_seconds: Lifetime requested for each cache
+            min_chars: Prefixes shorter than this are not worth caching
+                (the API also rejects caches below a minimum token count)
+        """
+        self.client = client
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.min_chars = min_chars
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, contents: str, system_instruction: Optional[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (self.model_name, system_instruction or "", contents):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _renew_margin(self) -> float:
+        # Extend handles with less than a fifth of their TTL left
+        return self.ttl_seconds / 5
+
+    def acquire(self, contents: str, system_instruction: Optional[str] = None) -> Optional[str]:
+        """
+        Get a cached-content handle for a shared prefix
+
+        Args:
+            contents: Large shared context (document, glossary, original text)
+            system_instruction: Optional instructions cached alongside it
+
+        Returns:
+            Cache name to pass as cached_content, or None when the prefix is
+            too small or the cache could not be created
+        """
+        if len(contents) + len(system_instruction or "") < self.min_chars:
+            return None
+
+        key = self._key(contents, system_instruction)
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(key)
+            if entry is not None and entry.failed:
+                return None
+            creating = entry is None
+            if creating:
+                # Pending marker: concurrent acquires of this prefix wait for
+                # this create instead of issuing their own
+                entry = _CacheEntry()
+                self._entries[key] = entry
+            entry.refcount += 1
+
+        # Network calls happen outside the lock so other prefixes, releases
+        # and keep-alives are never stuck behind a slow create
+        if creating:
+            name = self._create(key, contents, system_instruction)
+            with self._lock:
+                entry.name = name
+                entry.expires_at = time.monotonic() + self.ttl_seconds
+            entry.ready.set()
+        else:
+            entry.ready.wait()
+
+        if entry.name is None:
+            with self._lock:
+                entry.refcount -= 1
+            return None
+        if not creating:
+            self._renew(entry)
+        return entry.name
+
+    def release(self, name: str):
+        """
+        Drop a reference obtained from acquire
+
+        The upstream cache is left to expire on its own TTL, so a later
+        acquire of the same prefix can still reuse it.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.name == name:
+                    entry.refcount = max(0, entry.refcount - 1)
+                    break
+            self._purge_expired()
+
+    def keep_alive(self, name: str):
+        """Extend a handle's TTL if it is close to expiring (for long jobs)"""
+        with self._lock:
+            entry = next((entry for entry in self._entries.values() if entry.name == name), None)
+        if entry is not None:
+            self._renew(entry)
+
+    @contextmanager
+    def lease(self, contents: str, system_instruction: Optional[str] = None) -> Iterator[Optional[str]]:
+        """
+        Context manager around acquire/release
+
+        Yields:
+            Cache name, or None when the prefix is not cached
+        """
+        name = self.acquire(contents, system_instruction)
+        try:
+            yield name
+        finally:
+            if name:
+                self.release(name)
+
+    def clear(self):
+        """Delete every unreferenced upstream cache now instead of waiting for its TTL"""
+        with self._lock:
+            unused = [
+                (key, entry) for key, entry in self._entries.items()
+                if not entry.refcount and entry.name
+            ]
+            for key, _ in unused:
+                del self._entries[key]
+
+        for _, entry in unused:
+            try:
+                self.client.caches.delete(name=entry.name)
+            except Exception:
+                pass
+
+    def _create(self, key: str, contents: str, system_instruction: Optional[str]) -> Optional[str]:
+        config = {
+            "contents": [{"role": "user", "parts": [{"text": contents}]}],
+            "ttl": f"{self.ttl_seconds}s",
+            "display_name": f"translingua-{key[:16]}"
+        }
+        if system_instruction:
+            config["system_instruction"] = system_instruction
+
+        try:
+            cached = self.client.caches.create(model=self.model_name, config=config)
+        except Exception as e:
+            print(f"⚠️ Context caching unavailable, sending full prompts: {str(e)}")
+            return None
+        return cached.name
+
+    def _renew(self, entry: _CacheEntry):
+        with self._lock:
+            if entry.renewing or entry.expires_at - time.monotonic() > self._renew_margin():
+                return
+            entry.renewing = True
+        try:
+            self.client.caches.update(name=entry.name, config={"ttl": f"{self.ttl_seconds}s"})
+            with self._lock:
+                entry.expires_at = time.monotonic() + self.ttl_seconds
+        except Exception as e:
+            print(f"⚠️ Could not extend context cache {entry.name}: {str(e)}")
+        finally:
+            with self._lock:
+                entry.renewing = False
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.refcount:
+                continue
+            if entry.failed:
+                # Negative result has run its TTL; try creating again
+                if entry.expires_at <= now:
+                    del self._entries[key]
+            elif entry.expires_at - now <= self._renew_margin():
+                # Too close to upstream expiry to hand out again
+                del self._entries[key]
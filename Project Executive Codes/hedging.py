@@ -0,0 +1,221 @@
+"""
+Request hedging for TransLingua application
+Cuts tail latency by racing a duplicate request against a slow one
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, TypeVar
+from config import Config
+
+T = TypeVar("T")
+
+
+def _bucket_bounds() -> List[float]:
+    """Geometric bucket upper bounds from 10 ms to ~2 minutes"""
+    bounds = []
+    bound = 0.01
+    while bound < 120:
+        bounds.append(bound)
+        bound *= 1.25
+    return bounds
+
+
+_BOUNDS = _bucket_bounds()
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram over the most recent latency samples"""
+
+    def __init__(self, window: int = Config.HEDGE_WINDOW_SIZE):
+        """
+        Args:
+            window: Number of most recent samples the histogram covers
+        """
+        self._samples = deque(maxlen=window)
+        self._counts = [0] * (len(_BOUNDS) + 1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        """Add one latency sample, evicting the oldest once the window is full"""
+        bucket = bisect.bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                self._counts[self._samples[0]] -= 1
+            self._samples.append(bucket)
+            self._counts[bucket] += 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Estimate a latency percentile
+
+        Args:
+            percent: Percentile between 0 and 100
+
+        Returns:
+            Upper bound of the bucket holding the percentile, or None without samples
+        """
+        with self._lock:
+            total = len(self._samples)
+            if not total:
+                return None
+            rank = max(1, math.ceil(percent / 100 * total))
+            seen = 0
+            for bucket, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return _BOUNDS[bucket] if bucket < len(_BOUNDS) else _BOUNDS[-1] * 1.25
+        return None
+
+
+class HedgingPolicy:
+    """
+    Issues a duplicate request when the first one is slower than usual
+
+    A call that has not returned within the configured percentile of recent
+    latency for its method gets a second, identical request; whichever
+    finishes first wins. Hedges are capped at a percentage of all calls so
+    a slow upstream is not hit with double the load.
+    """
+
+    def __init__(
+        self,
+        percentile: float = Config.HEDGE_PERCENTILE,
+        budget_percent: float = Config.HEDGE_BUDGET_PERCENT,
+        min_samples: int = Config.HEDGE_MIN_SAMPLES,
+        max_workers: int = Config.HEDGE_MAX_WORKERS
+    ):
+        """
+        Args:
+            percentile: Latency percentile after which a hedge is sent
+            budget_percent: Maximum hedges as a percentage of calls
+            min_samples: Samples a method needs before it is hedged at all
+            max_workers: Threads available for primary and hedge requests
+        """
+        self.percentile = percentile
+        self.budget_percent = budget_percent
+        self.min_samples = min_samples
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedges = 0
+
+    def histogram(self, method: str) -> LatencyHistogram:
+        """Latency histogram for a method, created on first use"""
+        with self._lock:
+            if method not in self._histograms:
+                self._histograms[method] = LatencyHistogram()
+            return self._histograms[method]
+
+    def stats(self) -> Dict[str, int]:
+        """Calls and hedges counted towards the current budget window"""
+        with self._lock:
+            return {"calls": self._calls, "hedges": self._hedges}
+
+    def _count_call(self):
+        with self._lock:
+            self._calls += 1
+            # Halve both counters periodically so the budget tracks recent traffic
+            if self._calls >= Config.HEDGE_BUDGET_WINDOW:
+                self._calls //= 2
+                self._hedges //= 2
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges + 1 > self._calls * self.budget_percent / 100:
+                return False
+            self._hedges += 1
+            return True
+
+    @staticmethod
+    def _attempt(
+        request: Callable[[], T],
+        histogram: LatencyHistogram,
+        slot: Optional[Callable[[], ContextManager]],
+        started: threading.Event
+    ) -> T:
+        try:
+            with slot() if slot else nullcontext():
+                # Time only the upstream call; waiting for a slot is not
+                # upstream latency and must not shorten the hedge delay
+                started.set()
+                begin = time.monotonic()
+                result = request()
+                # Losers are recorded too, so the histogram sees true upstream latency
+                histogram.record(time.monotonic() - begin)
+                return result
+        finally:
+            started.set()
+
+    def call(
+        self,
+        method: str,
+        request: Callable[[], T],
+        slot: Optional[Callable[[], ContextManager]] = None,
+        may_hedge: Optional[Callable[[], bool]] = None
+    ) -> T:
+        """
+        Run request, hedging it if it outlives the method's latency percentile
+
+        Args:
+            method: Name the latency histogram is kept under
+            request: Zero-argument callable performing the upstream request
+            slot: Optional factory for a context manager each attempt must
+                hold while it runs, such as a concurrency limiter slot
+            may_hedge: Optional check that vetoes a hedge, e.g. while the
+                limiter has no free slot for it
+
+        Returns:
+            Result of whichever attempt succeeded first
+        """
+        histogram = self.histogram(method)
+        self._count_call()
+
+        delay = self.percentile_delay(method)
+        if delay is None:
+            return self._attempt(request, histogram, slot, threading.Event())
+
+        primary_started = threading.Event()
+        primary = self._executor.submit(self._attempt, request, histogram, slot, primary_started)
+        # The delay only counts from when the primary actually reached
+        # upstream, so a call still queued for a slot is never hedged
+        primary_started.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or (may_hedge and not may_hedge()) or not self._take_hedge():
+            return primary.result()
+
+        hedge = self._executor.submit(self._attempt, request, histogram, slot, threading.Event())
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The sync client cannot abort an in-flight HTTP call; this
+                    # only stops a hedge that has not started yet, and a running
+                    # loser's result is discarded
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def percentile_delay(self, method: str) -> Optional[float]:
+        """Hedge delay for a method, or None until enough samples exist"""
+        histogram = self.histogram(method)
+        if len(histogram) < self.min_samples:
+            return None
+        return histogram.percentile(self.percentile)
+
+    def shutdown(self):
+        """Stop the worker threads without waiting for abandoned requests"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
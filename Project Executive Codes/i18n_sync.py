@@ -0,0 +1,592 @@
+"""
+Locale bundle sync for TransLingua application
+Incrementally translates JSON and gettext .po resource bundles
+
+Only strings that are new, or whose source text changed since the last
+sync, are sent to the model; everything else is carried over from the
+existing target bundles.
+
+Usage:
+    python i18n_sync.py locales/en.json
+    python i18n_sync.py locales/en.po --targets es fr
+    python i18n_sync.py locales/en/LC_MESSAGES/app.po --pattern "{code}/LC_MESSAGES/app.po"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from translator import Translator
+
+STATE_FILE = ".translingua-sync.json"
+
+# {name}, {{name}}, %s, %d, %(name)s, %1$s, %@ and a literal %%. The
+# conversion must follow the % directly, so prose such as "50% off" is left alone
+PLACEHOLDER_RE = re.compile(
+    r"\{\{[^{}]*\}\}|\{[^{}]*\}|%(?:\([^)]+\))?(?:\d+\$)?[-+#0]*\d*(?:\.\d+)?[sdifuxXeEgGcro@%]"
+)
+PLACEHOLDER_CONTEXT = (
+    "These are UI strings from an application resource file. "
+    "Tokens such as ⟦0⟧ are placeholders; copy them unchanged into the translation."
+)
+
+# Key suffix for the msgid_plural unit of a gettext entry
+PLURAL_SUFFIX = "\x00plural"
+
+# Plural-Forms headers for new gettext catalogs, keyed by language tag and
+# primary code (from the GNU gettext manual and CLDR plural rules)
+PLURAL_FORMS = {
+    "en": "nplurals=2; plural=(n != 1);",
+    "es": "nplurals=2; plural=(n != 1);",
+    "fr": "nplurals=2; plural=(n > 1);",
+    "de": "nplurals=2; plural=(n != 1);",
+    "it": "nplurals=2; plural=(n != 1);",
+    "pt": "nplurals=2; plural=(n != 1);",
+    "pt-BR": "nplurals=2; plural=(n > 1);",
+    "ru": "nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);",
+    "zh": "nplurals=1; plural=0;",
+    "ja": "nplurals=1; plural=0;",
+    "ko": "nplurals=1; plural=0;",
+    "ar": "nplurals=6; plural=(n==0 ? 0 : n==1 ? 1 : n==2 ? 2 : n%100>=3 && n%100<=10 ? 3 : n%100>=11 ? 4 : 5);",
+    "hi": "nplurals=2; plural=(n != 1);",
+    "nl": "nplurals=2; plural=(n != 1);",
+    "sv": "nplurals=2; plural=(n != 1);",
+    "no": "nplurals=2; plural=(n != 1);",
+    "nb": "nplurals=2; plural=(n != 1);",
+    "da": "nplurals=2; plural=(n != 1);",
+    "fi": "nplurals=2; plural=(n != 1);",
+    "pl": "nplurals=3; plural=(n==1 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);",
+    "tr": "nplurals=2; plural=(n != 1);",
+    "el": "nplurals=2; plural=(n != 1);",
+}
+
+
+def plural_forms(language_code: str) -> Optional[str]:
+    """Plural-Forms header value for a language tag, or None if unknown"""
+    tag = language_code.replace("_", "-")
+    return PLURAL_FORMS.get(tag) or PLURAL_FORMS.get(tag.split("-")[0].lower())
+
+
+def source_hash(text: str) -> str:
+    """Short, stable hash of a source string"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def protect_placeholders(text: str) -> Tuple[str, List[str]]:
+    """
+    Replace placeholders with numbered tokens the model is told to keep
+
+    Returns:
+        (protected text, placeholders in order of appearance)
+    """
+    placeholders = []
+
+    def replace(match):
+        placeholders.append(match.group(0))
+        return f"⟦{len(placeholders) - 1}⟧"
+
+    return PLACEHOLDER_RE.sub(replace, text), placeholders
+
+
+def restore_placeholders(text: str, placeholders: List[str]) -> Optional[str]:
+    """
+    Put placeholders back and check none were lost, duplicated or invented
+
+    Returns:
+        Restored text, or None if the tokens do not match the source
+    """
+    tokens = re.findall(r"⟦(\d+)⟧", text)
+    if Counter(tokens) != Counter(str(i) for i in range(len(placeholders))):
+        return None
+    return re.sub(r"⟦(\d+)⟧", lambda m: placeholders[int(m.group(1))], text)
+
+
+def stage_file(path: str, content: str) -> str:
+    """
+    Write content to a temporary sibling of path
+
+    Returns:
+        Temporary file path, to be moved into place with os.replace
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".i18n-sync-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as handle:
+            handle.write(content)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+class JsonBundle:
+    """
+    Nested JSON locale file (i18next / react-intl style)
+
+    Strings inside arrays are keyed by their index, e.g. "help.steps.0".
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+
+    @classmethod
+    def load(cls, path: str) -> "JsonBundle":
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls(json.load(handle))
+
+    @staticmethod
+    def _flatten(node, prefix: str = "") -> Dict[str, str]:
+        units = {}
+        if isinstance(node, dict):
+            for key, value in node.items():
+                units.update(JsonBundle._flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+        elif isinstance(node, list):
+            for index, value in enumerate(node):
+                units.update(JsonBundle._flatten(value, f"{prefix}.{index}" if prefix else str(index)))
+        elif isinstance(node, str):
+            units[prefix] = node
+        return units
+
+    def units(self) -> Dict[str, str]:
+        """Translatable strings keyed by dotted path"""
+        return self._flatten(self.data)
+
+    def translations(self) -> Dict[str, str]:
+        """Existing translations keyed by dotted path"""
+        return self.units()
+
+    def render(self, translations: Dict[str, str], language_code: str, target=None) -> str:
+        """
+        Build a target bundle with this bundle's structure
+
+        Keys without a translation are left out so the application falls
+        back to its default locale for them. Dropping one array item would
+        shift the others, so an array with any untranslated string is left
+        out as a whole.
+        """
+        def build(node, prefix=""):
+            if isinstance(node, dict):
+                result = {}
+                for key, value in node.items():
+                    path = f"{prefix}.{key}" if prefix else str(key)
+                    built = build(value, path)
+                    if built is not None:
+                        result[key] = built
+                return result
+            if isinstance(node, list):
+                result = []
+                for index, value in enumerate(node):
+                    built = build(value, f"{prefix}.{index}" if prefix else str(index))
+                    if built is None:
+                        return None
+                    result.append(built)
+                return result
+            if isinstance(node, str):
+                return translations.get(prefix)
+            return node
+
+        built = build(self.data)
+        return json.dumps(built if built is not None else [], ensure_ascii=False, indent=2) + "\n"
+
+
+class PoEntry:
+    """One gettext catalog entry"""
+
+    def __init__(self):
+        self.comments: List[str] = []
+        self.msgctxt: Optional[str] = None
+        self.msgid: Optional[str] = None
+        self.msgid_plural: Optional[str] = None
+        self.msgstr: Dict[int, str] = {}
+
+    @property
+    def key(self) -> str:
+        # Same convention as compiled .mo files: context EOT msgid
+        return f"{self.msgctxt}\x04{self.msgid}" if self.msgctxt is not None else self.msgid
+
+
+def _po_unquote(text: str) -> str:
+    return json.loads(text) if text.startswith('"') else ""
+
+
+def _po_quote(text: str) -> str:
+    quoted = [json.dumps(line, ensure_ascii=False) for line in text.splitlines(keepends=True)]
+    if len(quoted) <= 1:
+        return quoted[0] if quoted else '""'
+    return '""\n' + "\n".join(quoted)
+
+
+class PoBundle:
+    """gettext .po catalog"""
+
+    def __init__(self, entries: List[PoEntry]):
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path: str) -> "PoBundle":
+        entries = []
+        entry = PoEntry()
+        field = None
+
+        def flush():
+            nonlocal entry, field
+            if entry.msgid is not None:
+                entries.append(entry)
+            entry, field = PoEntry(), None
+
+        with open(path, "r", encoding="utf-8") as handle:
+            for raw in handle:
+                line = raw.strip()
+                if not line:
+                    flush()
+                elif line.startswith("#~"):
+                    continue
+                elif line.startswith("#"):
+                    if entry.msgid is not None:
+                        flush()
+                    entry.comments.append(line)
+                elif line.startswith('"') and field:
+                    kind, index = field
+                    value = _po_unquote(line)
+                    if kind == "msgstr":
+                        entry.msgstr[index] += value
+                    else:
+                        setattr(entry, kind, getattr(entry, kind) + value)
+                else:
+                    keyword, _, value = line.partition(" ")
+                    value = _po_unquote(value.strip())
+                    if keyword in ("msgctxt", "msgid") and entry.msgid is not None:
+                        flush()
+                    if keyword == "msgstr":
+                        field = ("msgstr", 0)
+                        entry.msgstr[0] = value
+                    elif keyword.startswith("msgstr["):
+                        field = ("msgstr", int(keyword[7:-1]))
+                        entry.msgstr[field[1]] = value
+                    elif keyword in ("msgctxt", "msgid", "msgid_plural"):
+                        field = (keyword, None)
+                        setattr(entry, keyword, value)
+        flush()
+        return cls(entries)
+
+    def header(self) -> Optional[PoEntry]:
+        for entry in self.entries:
+            if entry.msgid == "" and entry.msgctxt is None:
+                return entry
+        return None
+
+    def _messages(self) -> List[PoEntry]:
+        return [entry for entry in self.entries if entry.msgid]
+
+    def units(self) -> Dict[str, str]:
+        """Source strings keyed by msgid (plural forms get a suffixed key)"""
+        units = {}
+        for entry in self._messages():
+            units[entry.key] = entry.msgid
+            if entry.msgid_plural is not None:
+                units[entry.key + PLURAL_SUFFIX] = entry.msgid_plural
+        return units
+
+    def translations(self) -> Dict[str, str]:
+        """Existing, non-empty, non-fuzzy translations keyed like units()"""
+        translations = {}
+        for entry in self._messages():
+            if any("fuzzy" in comment for comment in entry.comments if comment.startswith("#,")):
+                continue
+            if entry.msgstr.get(0):
+                translations[entry.key] = entry.msgstr[0]
+            if entry.msgid_plural is not None and entry.msgstr.get(1):
+                translations[entry.key + PLURAL_SUFFIX] = entry.msgstr[1]
+        return translations
+
+    def render(self, translations: Dict[str, str], language_code: str, target: Optional["PoBundle"] = None) -> str:
+        """
+        Build a target catalog with this catalog's entries and comments
+
+        The target's own header is kept when it has one. Otherwise the
+        Plural-Forms line comes from PLURAL_FORMS; for a language missing
+        there it is dropped and the header marked fuzzy, since the source
+        language's rule would be wrong. msgstr[0] and msgstr[1] hold the
+        msgid and msgid_plural translations; further forms are carried over
+        from the target or left empty for a translator to fill in.
+        """
+        own_header = target.header() if target else None
+        header = own_header or self.header()
+        header_text = header.msgstr.get(0, "") if header else ""
+        header_comments = list(header.comments) if header else []
+        if re.search(r"^Language:", header_text, re.MULTILINE):
+            header_text = re.sub(r"^Language:.*$", f"Language: {language_code}", header_text, flags=re.MULTILINE)
+        else:
+            header_text += f"Language: {language_code}\n"
+        if own_header is None or not re.search(r"^Plural-Forms:", header_text, re.MULTILINE):
+            header_text = re.sub(r"^Plural-Forms:.*\n?", "", header_text, flags=re.MULTILINE)
+            rule = plural_forms(language_code)
+            if rule:
+                header_text += f"Plural-Forms: {rule}\n"
+            elif not any("fuzzy" in comment for comment in header_comments if comment.startswith("#,")):
+                header_comments.append("#, fuzzy")
+        plural_match = re.search(r"nplurals\s*=\s*(\d+)", header_text)
+        nplurals = int(plural_match.group(1)) if plural_match else 2
+        previous = {entry.key: entry for entry in target._messages()} if target else {}
+
+        blocks = []
+        blocks.append("\n".join(header_comments + ['msgid ""', f"msgstr {_po_quote(header_text)}"]))
+
+        for entry in self._messages():
+            lines = [comment for comment in entry.comments if not comment.startswith("#,")]
+            flags = [
+                flag.strip()
+                for comment in entry.comments if comment.startswith("#,")
+                for flag in comment[2:].split(",")
+                if flag.strip() and flag.strip() != "fuzzy"
+            ]
+            if flags:
+                lines.append("#, " + ", ".join(flags))
+            if entry.msgctxt is not None:
+                lines.append(f"msgctxt {_po_quote(entry.msgctxt)}")
+            lines.append(f"msgid {_po_quote(entry.msgid)}")
+
+            singular = translations.get(entry.key, "")
+            if entry.msgid_plural is None:
+                lines.append(f"msgstr {_po_quote(singular)}")
+            else:
+                plural = translations.get(entry.key + PLURAL_SUFFIX, "")
+                forms = {0: singular, 1: plural}
+                old = previous.get(entry.key)
+                if old is not None and plural and old.msgstr.get(1) == plural:
+                    # Higher forms were written by a translator for this plural
+                    forms = {**old.msgstr, **forms}
+                lines.append(f"msgid_plural {_po_quote(entry.msgid_plural)}")
+                for index in range(nplurals):
+                    lines.append(f"msgstr[{index}] {_po_quote(forms.get(index, ''))}")
+            blocks.append("\n".join(lines))
+
+        return "\n\n".join(blocks) + "\n"
+
+
+def load_bundle(path: str):
+    """Load a bundle, choosing the format from the file extension"""
+    if path.endswith((".po", ".pot")):
+        return PoBundle.load(path)
+    return JsonBundle.load(path)
+
+
+class BundleSync:
+    """Diffs a source bundle against its targets and translates the difference"""
+
+    def __init__(
+        self,
+        translator,
+        source_path: str,
+        source_lang: str,
+        pattern: str,
+        batch_size: int = Config.I18N_BATCH_SIZE,
+        max_workers: int = Config.I18N_MAX_WORKERS
+    ):
+        """
+        Args:
+            translator: Translator instance
+            source_path: Source locale bundle
+            source_lang: Source language name
+            pattern: Target path relative to the source directory, with {code}
+            batch_size: Strings per model call
+            max_workers: Model calls in flight at once
+        """
+        self.translator = translator
+        self.source_path = source_path
+        self.source_lang = source_lang
+        self.pattern = pattern
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.base_dir = os.path.dirname(os.path.abspath(source_path))
+        self.state_path = os.path.join(self.base_dir, STATE_FILE)
+        self.source = load_bundle(source_path)
+        self.hashes = {key: source_hash(text) for key, text in self.source.units().items()}
+        self.state = self._load_state()
+
+    def target_path(self, code: str) -> str:
+        return os.path.join(self.base_dir, self.pattern.format(code=code))
+
+    def _state_key(self, path: str) -> str:
+        # Several bundles can share a directory, so state is kept per target file
+        return os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+
+    def _load_state(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def plan(self, targets: List[str]) -> Dict[str, dict]:
+        """
+        Work out what each target needs
+
+        A string is kept when the target already has it and its recorded
+        source hash still matches; strings a target has but that were never
+        synced (e.g. translated by hand) are trusted and adopted as-is.
+
+        Returns:
+            {language name: {"code", "path", "bundle", "kept", "pending"}}
+        """
+        units = self.source.units()
+        plans = {}
+        for language in targets:
+            code = Config.language_code(language)
+            path = self.target_path(code)
+            bundle = load_bundle(path) if os.path.exists(path) else None
+            existing = bundle.translations() if bundle else {}
+            recorded = self.state.get(self._state_key(path), {})
+
+            kept, pending = {}, {}
+            for key, text in units.items():
+                current = self.hashes[key]
+                if not text.strip():
+                    kept[key] = text
+                elif key in existing and recorded.get(key, current) == current:
+                    kept[key] = existing[key]
+                else:
+                    pending[key] = text
+            plans[language] = {
+                "code": code,
+                "path": path,
+                "bundle": bundle,
+                "kept": kept,
+                "pending": pending
+            }
+        return plans
+
+    def _translate_batch(self, language: str, items: List[Tuple[str, str]]) -> Tuple[Dict[str, str], List[str]]:
+        protected = [protect_placeholders(text) for _, text in items]
+        try:
+            outputs = self.translator.translate_batch(
+                [text for text, _ in protected], self.source_lang, language, PLACEHOLDER_CONTEXT
+            )
+        except Exception:
+            outputs = [None] * len(items)
+
+        translated, failed = {}, []
+        for (key, _), (text, placeholders), output in zip(items, protected, outputs):
+            restored = restore_placeholders(output, placeholders) if output is not None else None
+            if restored is None:
+                # One retry on its own before giving up on the string
+                try:
+                    retry = self.translator.translate_batch(
+                        [text], self.source_lang, language, PLACEHOLDER_CONTEXT
+                    )[0]
+                    restored = restore_placeholders(retry, placeholders)
+                except Exception:
+                    restored = None
+            if restored is None:
+                failed.append(key)
+            else:
+                translated[key] = restored
+        return translated, failed
+
+    def run(self, targets: List[str], dry_run: bool = False) -> Dict[str, dict]:
+        """
+        Sync every target bundle
+
+        All batches for all targets run in one thread pool. Target files are
+        staged first and then renamed into place together, followed by the
+        sync state, so an interrupted run leaves the previous bundles intact.
+
+        Returns:
+            Per-language summary with kept/translated/failed counts
+        """
+        plans = self.plan(targets)
+        if dry_run:
+            return {
+                language: {"kept": len(plan["kept"]), "pending": len(plan["pending"])}
+                for language, plan in plans.items()
+            }
+
+        jobs = []
+        for language, plan in plans.items():
+            items = list(plan["pending"].items())
+            for start in range(0, len(items), self.batch_size):
+                jobs.append((language, items[start:start + self.batch_size]))
+
+        results = {language: ({}, []) for language in plans}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._translate_batch, language, items): language for language, items in jobs}
+            for future in as_completed(futures):
+                translated, failed = future.result()
+                results[futures[future]][0].update(translated)
+                results[futures[future]][1].extend(failed)
+
+        summary, staged = {}, []
+        try:
+            for language, plan in plans.items():
+                translated, failed = results[language]
+                merged = {**plan["kept"], **translated}
+                content = self.source.render(merged, plan["code"], plan["bundle"])
+                staged.append((stage_file(plan["path"], content), plan["path"]))
+                self.state[self._state_key(plan["path"])] = {key: self.hashes[key] for key in merged}
+                summary[language] = {"kept": len(plan["kept"]), "translated": len(translated), "failed": failed}
+            state = json.dumps(self.state, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+            staged.append((stage_file(self.state_path, state), self.state_path))
+        except BaseException:
+            for tmp_path, _ in staged:
+                os.unlink(tmp_path)
+            raise
+
+        for tmp_path, path in staged:
+            os.replace(tmp_path, path)
+        return summary
+
+
+def _language_name(code: str) -> Optional[str]:
+    for name, language_code in Config.LANGUAGES.items():
+        if language_code == code:
+            return name
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Incrementally translate locale bundles with TransLingua")
+    parser.add_argument("source", help="Source bundle (.json, .po or .pot)")
+    parser.add_argument("--source-lang", help="Source language name (default: inferred from file name, else English)")
+    parser.add_argument("--targets", nargs="+", help="Target language names or codes (default: all supported)")
+    parser.add_argument("--pattern", help="Target path relative to the source directory (default: {code}<ext>)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be translated")
+    args = parser.parse_args(argv)
+
+    stem, extension = os.path.splitext(os.path.basename(args.source))
+    source_lang = args.source_lang or _language_name(stem) or "English"
+    pattern = args.pattern or f"{{code}}{'.po' if extension == '.pot' else extension}"
+    targets = [
+        _language_name(target) or target for target in (args.targets or Config.LANGUAGES)
+        if (_language_name(target) or target) != source_lang
+    ]
+
+    try:
+        # A dry run only diffs files, so it needs no API credentials
+        sync = BundleSync(None if args.dry_run else Translator(), args.source, source_lang, pattern)
+        summary = sync.run(targets, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Sync failed: {str(e)}")
+        return 1
+
+    exit_code = 0
+    for language, result in summary.items():
+        if args.dry_run:
+            print(f"   {language}: {result['pending']} to translate, {result['kept']} up to date")
+            continue
+        print(f"✅ {language}: {result['translated']} translated, {result['kept']} up to date")
+        if result["failed"]:
+            exit_code = 2
+            print(f"⚠️ {language}: {len(result['failed'])} strings failed placeholder validation or translation")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
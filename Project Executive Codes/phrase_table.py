@@ -0,0 +1,402 @@
+"""
+Phrase table index for TransLingua application
+Serves exact and fuzzy translation-memory hits from a memory-mapped file
+"""
+
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config import Config
+
+# Any run of whitespace or control characters collapses to a single space,
+# which also guarantees keys never contain the tab/newline field separators
+_WHITESPACE_RE = re.compile(r"[\s\x00-\x1f]+")
+
+_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+_UNESCAPE_RE = re.compile(r"\\(.)")
+
+# Trigram index stored next to the phrase index (path + GRAM_SUFFIX):
+# header, line offsets (uint64), bucket starts (uint64) and posting lists
+# of line numbers (uint32), all in native byte order
+GRAM_SUFFIX = ".grams"
+_GRAM_MAGIC = b"TLGRAM01"
+_GRAM_HEADER = struct.Struct("=8sII")
+_GRAM_BUCKETS = 1 << 20
+
+
+def normalize_segment(text: str) -> str:
+    """
+    Normalize a source segment into a lookup key
+
+    Case is kept: "Turkey" and "turkey", or "US" and "us", are different
+    segments with different translations. Only fuzzy scoring ignores case.
+
+    Args:
+        text: Source text
+
+    Returns:
+        NFC-normalized text with collapsed whitespace
+    """
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def escape_field(text: str) -> str:
+    """Escape backslashes, tabs and newlines for a single-line field"""
+    return "".join(_ESCAPES.get(ch, ch) for ch in text)
+
+
+def unescape_field(text: str) -> str:
+    """Reverse escape_field"""
+    return _UNESCAPE_RE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def _record_key(source_lang: str, target_lang: str, key: str) -> bytes:
+    return f"{source_lang}\t{target_lang}\t{key}".encode("utf-8")
+
+
+def _gram_buckets(source_lang: str, target_lang: str, key: str) -> Set[int]:
+    """
+    Hash buckets of a key's distinct case-folded character trigrams
+
+    The key is padded at both ends so that even one-character keys have a
+    trigram. Buckets are salted with the language pair, so posting lists
+    mostly hold lines of the pair being searched.
+    """
+    padded = f"\x02{key.casefold()}\x03"
+    salt = zlib.crc32(f"{source_lang}\t{target_lang}\t".encode("utf-8"))
+    return {
+        zlib.crc32(padded[i:i + 3].encode("utf-8"), salt) % _GRAM_BUCKETS
+        for i in range(len(padded) - 2)
+    }
+
+
+def write_phrase_index(records: Iterable[Tuple[str, str, str, str]], path: str) -> int:
+    """
+    Write an index file from records already sorted by key
+
+    The trigram index used by fuzzy lookups is written alongside it. Both
+    files are written next to their destination and moved into place
+    atomically, so readers never see a partially written index. Building
+    the trigram index keeps about 4 bytes per key character in memory.
+
+    Args:
+        records: (source_lang, target_lang, normalized_key, translation)
+            tuples in ascending byte order of their UTF-8 key columns
+        path: Destination index path
+
+    Returns:
+        Number of records written
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".phrase-index-")
+    gram_path = None
+    offsets = array("Q")
+    postings: Dict[int, array] = {}
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            offset = 0
+            for line_number, (source_lang, target_lang, key, translation) in enumerate(records):
+                line = f"{source_lang}\t{target_lang}\t{key}\t{escape_field(translation)}\n".encode("utf-8")
+                handle.write(line)
+                offsets.append(offset)
+                offset += len(line)
+                for bucket in _gram_buckets(source_lang, target_lang, key):
+                    postings.setdefault(bucket, array("I")).append(line_number)
+
+        gram_fd, gram_path = tempfile.mkstemp(dir=directory, prefix=".phrase-index-")
+        with os.fdopen(gram_fd, "wb") as handle:
+            _write_gram_index(handle, offsets, postings)
+        os.replace(gram_path, path + GRAM_SUFFIX)
+        gram_path = None
+        os.replace(tmp_path, path)
+    except BaseException:
+        for leftover in (tmp_path, gram_path):
+            if leftover and os.path.exists(leftover):
+                os.unlink(leftover)
+        raise
+    return len(offsets)
+
+
+def _write_gram_index(handle, offsets: array, postings: Dict[int, array]):
+    handle.write(_GRAM_HEADER.pack(_GRAM_MAGIC, _GRAM_BUCKETS, len(offsets)))
+    handle.write(offsets.tobytes())
+    sizes = array("Q", bytes(8 * (_GRAM_BUCKETS + 1)))
+    for bucket, lines in postings.items():
+        sizes[bucket + 1] = len(lines)
+    handle.write(array("Q", accumulate(sizes)).tobytes())
+    for bucket in sorted(postings):
+        handle.write(postings[bucket].tobytes())
+
+
+def build_phrase_index(entries: Iterable[Tuple[str, str, str, str]], path: str) -> int:
+    """
+    Build an index file from unsorted phrase pairs
+
+    Args:
+        entries: (source_lang, target_lang, source_text, translation) tuples;
+            later duplicates of the same source segment win
+        path: Destination index path
+
+    Returns:
+        Number of unique records written
+    """
+    table = {}
+    for source_lang, target_lang, source_text, translation in entries:
+        key = normalize_segment(source_text)
+        if key:
+            table[_record_key(source_lang, target_lang, key)] = translation
+
+    records = (
+        tuple(record.decode("utf-8").split("\t", 2)) + (table[record],)
+        for record in sorted(table)
+    )
+    return write_phrase_index(records, path)
+
+
+class PhraseIndex:
+    """Read-only, memory-mapped phrase table with binary-search lookups"""
+
+    def __init__(self, path: str):
+        """
+        Map an index file written by write_phrase_index
+
+        Args:
+            path: Index file path
+        """
+        self.path = path
+        self._mm = b""
+        self._gram_file = None
+        self._gram_mm = None
+        self._line_offsets = self._gram_starts = self._gram_postings = None
+        self._file = open(path, "rb")
+        try:
+            if os.fstat(self._file.fileno()).st_size:
+                self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._open_grams(path + GRAM_SUFFIX)
+        except Exception:
+            self.close()
+            raise
+
+    def _open_grams(self, gram_path: str):
+        if not self._mm or not os.path.isfile(gram_path):
+            return
+        self._gram_file = open(gram_path, "rb")
+        self._gram_mm = mmap.mmap(self._gram_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, buckets, lines = _GRAM_HEADER.unpack_from(self._gram_mm)
+        if magic != _GRAM_MAGIC or buckets != _GRAM_BUCKETS:
+            raise ValueError(f"{gram_path} is not a trigram index this version can read")
+
+        view = memoryview(self._gram_mm)
+        offsets_start = _GRAM_HEADER.size
+        starts_start = offsets_start + 8 * lines
+        postings_start = starts_start + 8 * (buckets + 1)
+        self._line_offsets = view[offsets_start:starts_start].cast("Q")
+        self._gram_starts = view[starts_start:postings_start].cast("Q")
+        self._gram_postings = view[postings_start:].cast("I")
+        view.release()
+
+    @classmethod
+    def open(cls, path: Optional[str]) -> Optional["PhraseIndex"]:
+        """
+        Open an index if the file exists
+
+        Returns:
+            PhraseIndex instance, or None when no index has been built
+        """
+        if not path or not os.path.isfile(path):
+            return None
+        index = cls(path)
+        if index._mm and index._gram_postings is None:
+            print(f"⚠️ {path} has no trigram index; rebuild it with tm_io.py build-index for fuzzy suggestions")
+        return index
+
+    def close(self):
+        """Release the memory maps and file handles"""
+        # Views into the gram map must be released before it can close
+        for view in (self._line_offsets, self._gram_starts, self._gram_postings):
+            if view is not None:
+                view.release()
+        self._line_offsets = self._gram_starts = self._gram_postings = None
+        for handle in (self._gram_mm, self._mm, self._gram_file, self._file):
+            if handle is not None and not isinstance(handle, bytes):
+                handle.close()
+
+    def _line_bounds(self, start: int) -> Tuple[int, int]:
+        end = self._mm.find(b"\n", start)
+        return start, len(self._mm) if end == -1 else end
+
+    def _lower_bound(self, target: bytes) -> int:
+        """Offset of the first line whose key is >= target"""
+        mm = self._mm
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b"\n", lo, mid) + 1
+            start = max(start, lo)
+            start, end = self._line_bounds(start)
+            key_end = mm.rfind(b"\t", start, end)
+            if mm[start:key_end] < target:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _iter_lines(self, start: int, stop: int) -> Iterator[Tuple[bytes, bytes]]:
+        mm = self._mm
+        while start < stop:
+            start, end = self._line_bounds(start)
+            key_end = mm.rfind(b"\t", start, end)
+            yield mm[start:key_end], mm[key_end + 1:end]
+            start = end + 1
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Find an exact (normalized) match for a source segment
+
+        Args:
+            text: Source text
+            source_lang: Source language code
+            target_lang: Target language code
+
+        Returns:
+            Stored translation, or None on a miss
+        """
+        key = normalize_segment(text)
+        if not key or not self._mm:
+            return None
+
+        target = _record_key(source_lang, target_lang, key)
+        offset = self._lower_bound(target)
+        for line_key, value in self._iter_lines(offset, len(self._mm)):
+            if line_key == target:
+                return unescape_field(value.decode("utf-8"))
+            break
+        return None
+
+    def _posting_list(self, bucket: int) -> memoryview:
+        return self._gram_postings[self._gram_starts[bucket]:self._gram_starts[bucket + 1]]
+
+    def _gram_candidates(
+        self,
+        buckets: List[int],
+        required: int,
+        first_line: int,
+        stop_line: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Lines in [first_line, stop_line) sharing at least `required` buckets
+
+        A line sharing that many must appear in one of the
+        len(buckets) - required + 1 shortest posting lists, so only those
+        are read in full; the rest are probed by binary search.
+
+        Returns:
+            (shared buckets, line number) pairs, most shared first
+        """
+        buckets = sorted(buckets, key=lambda bucket: self._gram_starts[bucket + 1] - self._gram_starts[bucket])
+        probe_count = len(buckets) - required + 1
+        counts = Counter()
+        for bucket in buckets[:probe_count]:
+            postings = self._posting_list(bucket)
+            lo = bisect_left(postings, first_line)
+            hi = bisect_left(postings, stop_line, lo)
+            counts.update(postings[lo:hi])
+
+        rest = [self._posting_list(bucket) for bucket in buckets[probe_count:]]
+        candidates = []
+        for line, shared in counts.items():
+            for checked, postings in enumerate(rest):
+                if shared + len(rest) - checked < required:
+                    break
+                position = bisect_left(postings, line)
+                if position < len(postings) and postings[position] == line:
+                    shared += 1
+            if shared >= required:
+                candidates.append((shared, line))
+        candidates.sort(reverse=True)
+        return candidates
+
+    def fuzzy_lookup(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        min_similarity: float
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar stored segment for a language pair
+
+        Similarity is SequenceMatcher's ratio on case-folded text. Candidates
+        come from the trigram index: a segment at least min_similarity alike
+        differs by at most (1 - t) * (a + b) insertions and deletions, each
+        of which breaks at most three trigrams, so it must share a known
+        number of the query's trigrams. Where that bound is too weak to
+        filter (low thresholds, short texts), at least
+        FUZZY_MIN_SHARED_GRAMS of them are required instead.
+
+        Args:
+            text: Source text
+            source_lang: Source language code
+            target_lang: Target language code
+            min_similarity: Minimum similarity ratio (0.0 - 1.0) to accept
+
+        Returns:
+            (translation, similarity) of the best match, or None (also when
+            the index was built without a trigram index)
+        """
+        key = normalize_segment(text).casefold()
+        if not key or self._gram_postings is None or not 0 < min_similarity <= 1:
+            return None
+
+        prefix = f"{source_lang}\t{target_lang}\t".encode("utf-8")
+        first_line = bisect_left(self._line_offsets, self._lower_bound(prefix))
+        stop_line = bisect_left(
+            self._line_offsets, self._lower_bound(f"{source_lang}\t{target_lang}\n".encode("utf-8"))
+        )
+        if first_line >= stop_line:
+            return None
+
+        length = len(key)
+        buckets = list(_gram_buckets(source_lang, target_lang, key))
+        # The longest candidate that can reach the threshold has
+        # length * (2 - t) / t characters, so a + b <= 2 * length / t
+        max_edits = math.floor(2 * length * (1 - min_similarity) / min_similarity + 1e-9)
+        required = max(
+            len(buckets) - 3 * max_edits,
+            math.ceil(len(buckets) * Config.FUZZY_MIN_SHARED_GRAMS),
+            1
+        )
+
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(key)
+        best = None
+        best_score = min_similarity
+        for _, line in self._gram_candidates(buckets, required, first_line, stop_line):
+            line_key, value = next(self._iter_lines(self._line_offsets[line], len(self._mm)))
+            candidate = line_key[len(prefix):].decode("utf-8").casefold()
+            # ratio() <= 2 * min(a, b) / (a + b)
+            if 2 * min(len(candidate), length) / (len(candidate) + length) < best_score:
+                continue
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score >= best_score:
+                best, best_score = value, score
+
+        if best is None:
+            return None
+        return unescape_field(best.decode("utf-8")), best_score
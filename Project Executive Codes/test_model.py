@@ -1,13 +1,13 @@
 import os
-import google.genai as genai
 from dotenv import load_dotenv
+from cassette import create_client
 
 # Load environment variables
 load_dotenv()
 
-# Configure API
+# Configure API (TRANSLINGUA_CASSETTE_MODE=replay runs this offline)
 api_key = os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=api_key)
+client = create_client(api_key)
 
 print("Testing with gemini-2.5-flash...")
 
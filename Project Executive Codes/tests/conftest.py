@@ -0,0 +1,14 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Config reads the environment when it is imported, so the tests pin it to
+# the committed cassette before any application module is loaded
+os.environ["TRANSLINGUA_CASSETTE_MODE"] = "replay"
+os.environ["TRANSLINGUA_CASSETTE"] = os.path.join(TESTS_DIR, "cassettes", "translator.jsonl.gz")
+os.environ.pop("TRANSLINGUA_CASSETTE_LATENCY", None)
+os.environ.pop("TRANSLINGUA_HEDGING", None)
+
+# The application modules live one directory up, alongside app.py
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+import concurrency
+from concurrency import BULK, INTERACTIVE, AdaptiveLimiter
+
+
+class Overloaded(Exception):
+    code = 429
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(concurrency.time, "monotonic", lambda: now[0])
+    return now
+
+
+def call(limiter, clock, latency, lane=INTERACTIVE, method="translate_text", error=None):
+    started = limiter.acquire(lane)
+    clock[0] += latency
+    limiter.release(lane, started, error, method)
+
+
+def test_limit_grows_only_while_it_is_used(clock):
+    limiter = AdaptiveLimiter(initial_limit=1)
+    call(limiter, clock, 0.1)
+    assert limiter.limit == 2
+
+    # One call at a limit of two leaves the limit unused
+    call(limiter, clock, 0.1)
+    assert limiter.limit == 2
+
+
+def test_429_shrinks_the_limit(clock):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    call(limiter, clock, 0.1, error=Overloaded())
+    assert limiter.limit == 7
+
+
+def test_decrease_happens_once_per_round_trip(clock):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    call(limiter, clock, 1.0)
+
+    first = limiter.acquire()
+    second = limiter.acquire()
+    clock[0] += 1.0
+    limiter.release(INTERACTIVE, first, Overloaded(), "translate_text")
+    limiter.release(INTERACTIVE, second, Overloaded(), "translate_text")
+    assert limiter.limit == 7
+
+    clock[0] += 1.5
+    call(limiter, clock, 0.0, error=Overloaded())
+    assert limiter.limit == 4
+
+
+def test_latency_is_compared_with_the_methods_own_baseline(clock):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    for _ in range(20):
+        call(limiter, clock, 0.1, method="translate_text")
+
+    # Documents are slow by nature; that is not overload
+    for _ in range(5):
+        call(limiter, clock, 3.0, lane=BULK, method="translate_document")
+    assert limiter.limit == 10
+
+    call(limiter, clock, 1.0, method="translate_text")
+    assert limiter.limit == 7
+    assert set(limiter.metrics()["latency"]) == {"translate_text", "translate_document"}
+
+
+def test_waiting_interactive_calls_go_before_bulk(clock):
+    limiter = AdaptiveLimiter(initial_limit=1)
+    holder = limiter.acquire(INTERACTIVE)
+    order = []
+
+    def worker(lane):
+        started = limiter.acquire(lane)
+        order.append(lane)
+        limiter.release(lane, started)
+
+    bulk = threading.Thread(target=worker, args=(BULK,))
+    bulk.start()
+    while not limiter.metrics()["queue_depth"][BULK]:
+        pass
+    interactive = threading.Thread(target=worker, args=(INTERACTIVE,))
+    interactive.start()
+    while not limiter.metrics()["queue_depth"][INTERACTIVE]:
+        pass
+
+    limiter.release(INTERACTIVE, holder)
+    bulk.join(5)
+    interactive.join(5)
+    assert order == [INTERACTIVE, BULK]
+
+
+def test_bulk_keeps_room_for_interactive_calls(clock):
+    limiter = AdaptiveLimiter(initial_limit=5, bulk_share=0.8)
+    for _ in range(4):
+        limiter.acquire(BULK)
+
+    assert not limiter.has_free_slot(BULK)
+    assert limiter.has_free_slot(INTERACTIVE)
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+import context_cache
+from context_cache import ContextCache
+
+PREFIX = "x" * 100
+
+
+class FakeCaches:
+    def __init__(self, fail=False, gate=None):
+        self.fail = fail
+        self.gate = gate
+        self.created = 0
+        self.updated = []
+
+    def create(self, model, config):
+        self.created += 1
+        if self.gate:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("content too small to cache")
+        return type("Cached", (), {"name": f"cachedContents/{self.created}"})()
+
+    def update(self, name, config):
+        self.updated.append(name)
+
+
+class FakeClient:
+    def __init__(self, caches):
+        self.caches = caches
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(context_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_failed_create_is_cached_for_the_ttl(clock):
+    caches = FakeCaches(fail=True)
+    cache = ContextCache(FakeClient(caches), "model", ttl_seconds=600, min_chars=10)
+
+    assert cache.acquire(PREFIX) is None
+    assert cache.acquire(PREFIX) is None
+    assert caches.created == 1
+
+    clock[0] += 601
+    assert cache.acquire(PREFIX) is None
+    assert caches.created == 2
+
+
+def test_waiter_on_a_failed_create_does_not_renew(clock):
+    gate = threading.Event()
+    caches = FakeCaches(fail=True, gate=gate)
+    cache = ContextCache(FakeClient(caches), "model", ttl_seconds=600, min_chars=10)
+
+    results = []
+    creator = threading.Thread(target=lambda: results.append(cache.acquire(PREFIX)))
+    creator.start()
+    while not caches.created:
+        pass
+    waiter = threading.Thread(target=lambda: results.append(cache.acquire(PREFIX)))
+    waiter.start()
+    entry = next(iter(cache._entries.values()))
+    while entry.refcount < 2:
+        pass
+    gate.set()
+    creator.join(5)
+    waiter.join(5)
+
+    assert results == [None, None]
+    assert caches.created == 1
+    assert caches.updated == []
+
+
+def test_successful_handle_is_shared_and_renewed_near_expiry(clock):
+    caches = FakeCaches()
+    cache = ContextCache(FakeClient(caches), "model", ttl_seconds=600, min_chars=10)
+
+    with cache.lease(PREFIX) as name:
+        clock[0] += 500
+        assert cache.acquire(PREFIX) == name
+        cache.release(name)
+
+    assert caches.created == 1
+    assert caches.updated == [name]
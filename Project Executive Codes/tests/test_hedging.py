@@ -0,0 +1,125 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from hedging import HedgingPolicy
+
+METHOD = "generate_content"
+
+
+@pytest.fixture
+def make_policy():
+    policies = []
+
+    def make(latency=0.05, samples=20, **kwargs):
+        kwargs.setdefault("budget_percent", 100)
+        kwargs.setdefault("min_samples", 20)
+        policy = HedgingPolicy(**kwargs)
+        for _ in range(samples):
+            policy.histogram(METHOD).record(latency)
+        policies.append(policy)
+        return policy
+
+    yield make
+    for policy in policies:
+        policy.shutdown()
+
+
+class Upstream:
+    """Request whose first attempt stalls until released (or a timeout)"""
+
+    def __init__(self, stall=0.3):
+        self.stall = stall
+        self.release = threading.Event()
+        self.started = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.started.append(time.monotonic())
+            attempt = len(self.started)
+        if attempt == 1:
+            self.release.wait(self.stall)
+            return "primary"
+        return "hedge"
+
+
+def test_no_hedge_before_min_samples(make_policy):
+    policy = make_policy(samples=19)
+    upstream = Upstream(stall=0.1)
+
+    assert policy.percentile_delay(METHOD) is None
+    assert policy.call(METHOD, upstream) == "primary"
+    assert len(upstream.started) == 1
+    assert policy.stats()["hedges"] == 0
+
+
+def test_hedge_fires_after_the_percentile_delay(make_policy):
+    policy = make_policy()
+    delay = policy.percentile_delay(METHOD)
+    upstream = Upstream(stall=5)
+
+    try:
+        assert policy.call(METHOD, upstream) == "hedge"
+    finally:
+        upstream.release.set()
+    assert len(upstream.started) == 2
+    assert upstream.started[1] - upstream.started[0] >= delay * 0.9
+    assert policy.stats()["hedges"] == 1
+
+
+def test_budget_caps_hedges(make_policy):
+    policy = make_policy(budget_percent=50)
+
+    # One call in the window: half a hedge is not a whole one
+    first = Upstream(stall=0.2)
+    assert policy.call(METHOD, first) == "primary"
+    assert len(first.started) == 1
+
+    second = Upstream(stall=5)
+    try:
+        assert policy.call(METHOD, second) == "hedge"
+    finally:
+        second.release.set()
+    assert policy.stats() == {"calls": 2, "hedges": 1}
+
+
+def test_may_hedge_vetoes_the_hedge(make_policy):
+    policy = make_policy()
+    upstream = Upstream(stall=0.2)
+    asked = []
+
+    def may_hedge():
+        asked.append(True)
+        return False
+
+    assert policy.call(METHOD, upstream, may_hedge=may_hedge) == "primary"
+    assert asked == [True]
+    assert len(upstream.started) == 1
+    assert policy.stats()["hedges"] == 0
+
+
+def test_slot_wait_does_not_count_toward_the_delay(make_policy):
+    policy = make_policy(latency=0.2)
+    slot_free = threading.Event()
+    timer = threading.Timer(4 * policy.percentile_delay(METHOD), slot_free.set)
+    attempts = []
+
+    @contextmanager
+    def slot():
+        slot_free.wait(5)
+        yield
+
+    def request():
+        attempts.append(True)
+        return "primary"
+
+    timer.start()
+    try:
+        assert policy.call(METHOD, request, slot=slot) == "primary"
+    finally:
+        timer.cancel()
+    assert len(attempts) == 1
+    assert policy.stats()["hedges"] == 0
@@ -0,0 +1,147 @@
+import json
+
+import pytest
+
+from i18n_sync import BundleSync, JsonBundle, PoBundle, protect_placeholders, restore_placeholders
+
+SOURCE_PO = """\
+msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Language: en\\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\\n"
+
+msgid "%d file"
+msgid_plural "%d files"
+msgstr[0] ""
+msgstr[1] ""
+"""
+
+
+@pytest.mark.parametrize("text, placeholders", [
+    ("Hello {name}", ["{name}"]),
+    ("{{count}} items in %(cart)s", ["{{count}}", "%(cart)s"]),
+    ("Page %1$d of %2$d", ["%1$d", "%2$d"]),
+    ("%5.2f%% done", ["%5.2f", "%%"]),
+    ("Get 50% off today", []),
+    ("Save 20% or more, 100% guaranteed", []),
+    ("Only %d left - 10% off", ["%d"]),
+])
+def test_protect_placeholders(text, placeholders):
+    protected, found = protect_placeholders(text)
+    assert found == placeholders
+    assert restore_placeholders(protected, found) == text
+
+
+def test_percent_literals_reach_the_model_unchanged():
+    protected, _ = protect_placeholders("Get 50% off today")
+    assert protected == "Get 50% off today"
+
+
+def test_restore_rejects_lost_or_duplicated_tokens():
+    protected, found = protect_placeholders("Hi {name}, you have %d messages")
+    assert protected == "Hi ⟦0⟧, you have ⟦1⟧ messages"
+    assert restore_placeholders("Hola ⟦0⟧, tienes mensajes", found) is None
+    assert restore_placeholders("Hola ⟦0⟧ ⟦0⟧, tienes ⟦1⟧ mensajes", found) is None
+    assert restore_placeholders("Hola ⟦0⟧, tienes ⟦1⟧ mensajes", found) == "Hola {name}, tienes %d mensajes"
+
+
+def _po_source(tmp_path):
+    path = tmp_path / "en.po"
+    path.write_text(SOURCE_PO, encoding="utf-8")
+    return PoBundle.load(str(path))
+
+
+def test_new_po_target_gets_its_own_plural_forms(tmp_path):
+    source = _po_source(tmp_path)
+    rendered = source.render({"%d file": "%d файл", "%d file\x00plural": "%d файла"}, "ru")
+
+    assert "nplurals=3; plural=(n%10==1" in rendered
+    assert "nplurals=2" not in rendered
+    assert 'msgstr[0] "%d файл"\nmsgstr[1] "%d файла"\nmsgstr[2] ""' in rendered
+
+
+def test_new_po_target_without_a_known_rule_is_left_fuzzy(tmp_path):
+    source = _po_source(tmp_path)
+    rendered = source.render({}, "xx")
+
+    assert "Plural-Forms" not in rendered
+    assert rendered.startswith("#, fuzzy\nmsgid \"\"")
+
+
+def test_existing_po_target_keeps_its_header_and_higher_forms(tmp_path):
+    source = _po_source(tmp_path)
+    target_path = tmp_path / "ru.po"
+    target_path.write_text(source.render({"%d file": "%d файл", "%d file\x00plural": "%d файла"}, "ru")
+                           .replace('msgstr[2] ""', 'msgstr[2] "%d файлов"'), encoding="utf-8")
+    target = PoBundle.load(str(target_path))
+
+    rendered = source.render(target.translations(), "ru", target)
+    assert 'msgstr[2] "%d файлов"' in rendered
+    assert rendered.count("Plural-Forms") == 1
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.batches = []
+
+    def translate_batch(self, texts, source_lang, target_lang, context=None):
+        self.batches.append(list(texts))
+        return [f"[{target_lang}] {text}" for text in texts]
+
+
+def test_json_arrays_are_flattened_by_index():
+    bundle = JsonBundle({"help": {"title": "Help", "steps": ["Open {file}", {"label": "Save"}]}, "count": 3})
+
+    assert bundle.units() == {
+        "help.title": "Help",
+        "help.steps.0": "Open {file}",
+        "help.steps.1.label": "Save",
+    }
+
+
+def test_json_array_with_an_untranslated_item_falls_back_as_a_whole():
+    bundle = JsonBundle({"title": "Help", "steps": ["One", "Two"]})
+
+    rendered = json.loads(bundle.render({"title": "Ayuda", "steps.0": "Uno"}, "es"))
+    assert rendered == {"title": "Ayuda"}
+
+
+def test_json_sync_plans_runs_and_keeps_unchanged_strings(tmp_path):
+    source = tmp_path / "en.json"
+    source.write_text(json.dumps({"title": "Help", "steps": ["Open {file}", "Save"]}), encoding="utf-8")
+    translator = FakeTranslator()
+
+    sync = BundleSync(translator, str(source), "English", "{code}.json")
+    assert sorted(sync.plan(["Spanish"])["Spanish"]["pending"]) == ["steps.0", "steps.1", "title"]
+    summary = sync.run(["Spanish"])
+
+    assert summary["Spanish"]["translated"] == 3 and not summary["Spanish"]["failed"]
+    assert json.loads((tmp_path / "es.json").read_text(encoding="utf-8")) == {
+        "title": "[Spanish] Help",
+        "steps": ["[Spanish] Open {file}", "[Spanish] Save"],
+    }
+
+    source.write_text(json.dumps({"title": "Help", "steps": ["Open {file}", "Save now"]}), encoding="utf-8")
+    plan = BundleSync(translator, str(source), "English", "{code}.json").plan(["Spanish"])["Spanish"]
+    assert list(plan["pending"]) == ["steps.1"]
+    assert plan["kept"]["steps.0"] == "[Spanish] Open {file}"
+
+
+def test_po_sync_round_trips(tmp_path):
+    source = tmp_path / "en.po"
+    source.write_text(SOURCE_PO + '\nmsgctxt "menu"\nmsgid "Open"\nmsgstr ""\n', encoding="utf-8")
+    translator = FakeTranslator()
+
+    BundleSync(translator, str(source), "English", "{code}.po").run(["Russian"])
+    target = PoBundle.load(str(tmp_path / "ru.po"))
+
+    assert target.translations() == {
+        "%d file": "[Russian] %d file",
+        "%d file\x00plural": "[Russian] %d files",
+        "menu\x04Open": "[Russian] Open",
+    }
+    translator.batches.clear()
+    summary = BundleSync(translator, str(source), "English", "{code}.po").run(["Russian"])
+    assert summary["Russian"] == {"kept": 3, "translated": 0, "failed": []}
+    assert translator.batches == []
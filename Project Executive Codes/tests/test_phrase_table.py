@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from phrase_table import (
+    GRAM_SUFFIX,
+    PhraseIndex,
+    _record_key,
+    build_phrase_index,
+    escape_field,
+    unescape_field,
+)
+
+ENTRIES = [
+    ("en", "es", "Save", "Guardar"),
+    ("en", "es", "Save as", "Guardar como"),
+    ("en", "es", "Turkey", "Turquía"),
+    ("en", "es", "turkey", "pavo"),
+    ("en", "es", "Line one\nline two", "Línea uno\tlínea dos"),
+    ("en", "es", "You have 19 new messages", "Tienes 19 mensajes nuevos"),
+    ("en", "fr", "Save", "Enregistrer"),
+    ("de", "en", "Speichern", "Save"),
+] + [("en", "es", f"Filler sentence number {i}", f"Frase de relleno {i}") for i in range(2000)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "phrase_index.tsv")
+    build_phrase_index(ENTRIES, path)
+    index = PhraseIndex(path)
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("text", ["plain", "tab\there", "new\nline", "back\\slash", "\\t literal", "\r\n", ""])
+def test_escape_round_trip(text):
+    escaped = escape_field(text)
+    assert "\t" not in escaped and "\n" not in escaped
+    assert unescape_field(escaped) == text
+
+
+@pytest.mark.parametrize("source, target, text, expected", [
+    ("en", "es", "Save", "Guardar"),
+    ("en", "es", "Save as", "Guardar como"),
+    ("en", "es", "Turkey", "Turquía"),
+    ("en", "es", "turkey", "pavo"),
+    ("en", "es", "  Line one   line two ", "Línea uno\tlínea dos"),
+    ("en", "fr", "Save", "Enregistrer"),
+    ("de", "en", "Speichern", "Save"),
+    ("en", "es", "Filler sentence number 1999", "Frase de relleno 1999"),
+])
+def test_lookup_hits(index, source, target, text, expected):
+    assert index.lookup(text, source, target) == expected
+
+
+@pytest.mark.parametrize("source, target, text", [
+    ("en", "es", "Sav"),
+    ("en", "es", "Save as copy"),
+    ("en", "es", "TURKEY"),
+    ("en", "de", "Save"),
+    ("aa", "aa", "Save"),
+    ("zz", "zz", "Save"),
+    ("en", "es", ""),
+])
+def test_lookup_misses(index, source, target, text):
+    assert index.lookup(text, source, target) is None
+
+
+def test_lower_bound_finds_first_line_not_below_target(index):
+    mm = index._mm
+    lines = mm[:].split(b"\n")[:-1]
+    keys = [line.rsplit(b"\t", 1)[0] for line in lines]
+    assert keys == sorted(keys)
+
+    for position in (0, 1, len(keys) // 2, len(keys) - 1):
+        offset = index._lower_bound(keys[position])
+        assert mm[offset:].startswith(lines[position] + b"\n")
+    assert index._lower_bound(b"") == 0
+    assert index._lower_bound(b"\xff") == len(mm)
+    assert index._lower_bound(_record_key("en", "es", "Save a")) == index._lower_bound(_record_key("en", "es", "Save as"))
+
+
+def test_fuzzy_lookup_scores_case_insensitively_within_the_pair(index):
+    translation, similarity = index.fuzzy_lookup("you have 10 new messages", "en", "es", 0.9)
+    assert translation == "Tienes 19 mensajes nuevos"
+    assert 0.9 <= similarity < 1
+    assert index.fuzzy_lookup("you have 10 new messages", "en", "fr", 0.5) is None
+    assert index.fuzzy_lookup("Something else entirely", "en", "es", 0.9) is None
+
+
+def test_fuzzy_lookup_reaches_every_line(index):
+    translation, _ = index.fuzzy_lookup("Filler sentence number 1999.", "en", "es", 0.95)
+    assert translation == "Frase de relleno 1999"
+    translation, _ = index.fuzzy_lookup("filler sentence numbr 7", "en", "es", 0.9)
+    assert translation == "Frase de relleno 7"
+
+
+def test_fuzzy_lookup_needs_the_trigram_index(tmp_path):
+    path = str(tmp_path / "phrase_index.tsv")
+    build_phrase_index(ENTRIES, path)
+    os.remove(path + GRAM_SUFFIX)
+    index = PhraseIndex(path)
+    try:
+        assert index.lookup("Save", "en", "es") == "Guardar"
+        assert index.fuzzy_lookup("Save!", "en", "es", 0.5) is None
+    finally:
+        index.close()
+
+
+def test_empty_index(tmp_path):
+    path = str(tmp_path / "phrase_index.tsv")
+    assert build_phrase_index([], path) == 0
+    index = PhraseIndex(path)
+    try:
+        assert index.lookup("Save", "en", "es") is None
+        assert index.fuzzy_lookup("Save", "en", "es", 0.5) is None
+    finally:
+        index.close()
@@ -0,0 +1,36 @@
+import pytest
+
+from tm_io import main, write_tsv
+from translation_memory import TranslationMemory
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "memory.db")
+    memory = TranslationMemory(path)
+    memory.add_many([
+        ("en-US", "pt-BR", "Bus stop", "Ponto de ônibus"),
+        ("en-US", "pt-PT", "Bus stop", "Paragem de autocarro"),
+        ("en-US", "fr", "Bus stop", "Arrêt de bus"),
+    ])
+    memory.close()
+    return path
+
+
+def test_export_tsv_refuses_several_regional_pairs(db, tmp_path, capsys):
+    output = tmp_path / "out.tsv"
+    assert main(("--db", db, "export-tsv", str(output), "--source", "en", "--target", "pt")) == 1
+    message = capsys.readouterr().out
+    assert "en-US->pt-BR" in message and "en-US->pt-PT" in message
+    assert not output.exists()
+
+
+def test_export_tsv_exports_the_single_matching_pair(db, tmp_path):
+    output = tmp_path / "out.tsv"
+    assert main(("--db", db, "export-tsv", str(output), "--source", "en", "--target", "pt-PT")) == 0
+    assert output.read_text(encoding="utf-8") == "Bus stop\tParagem de autocarro\n"
+
+
+def test_write_tsv_rejects_mixed_pairs(tmp_path):
+    with pytest.raises(ValueError):
+        write_tsv([("en", "pt-BR", "a", "b"), ("en", "pt-PT", "a", "c")], str(tmp_path / "out.tsv"))
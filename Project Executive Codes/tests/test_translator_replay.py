@@ -0,0 +1,33 @@
+import pytest
+
+from translator import Translator
+
+
+@pytest.fixture(scope="module")
+def translator():
+    return Translator()
+
+
+def test_replay_uses_only_the_cassette(translator):
+    assert translator.phrase_index is None
+    assert translator.memory is None
+    assert translator.get_model_info()["cassette_mode"] == "replay"
+
+
+def test_translate_text(translator):
+    assert translator.translate_text("Good morning", "English", "Spanish") == "Buenos días"
+
+
+def test_translate_batch(translator):
+    translations = translator.translate_batch(["Save", "Cancel", "Get 50% off today"], "English", "French")
+    assert translations == ["Enregistrer", "Annuler", "Profitez de 50 % de réduction aujourd'hui"]
+
+
+def test_refine_translation(translator):
+    refined = translator.refine_translation("Good morning", "Buenos días", "Make it more formal")
+    assert refined == "Muy buenos días tenga usted"
+
+
+def test_unrecorded_request_reports_a_miss(translator):
+    result = translator.translate_text("Nobody recorded this sentence", "English", "Spanish")
+    assert result.startswith("Translation Error: No recording")
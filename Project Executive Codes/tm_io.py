@@ -0,0 +1,302 @@
+"""
+Translation memory import/export for TransLingua application
+Streams TMX and TSV corpora into and out of the translation memory
+
+Usage:
+    python tm_io.py import-tmx corpus.tmx [--source en] [--target es]
+    python tm_io.py import-tsv corpus.tsv --source en --target es
+    python tm_io.py export-tmx out.tmx [--source en] [--target es]
+    python tm_io.py export-tsv out.tsv --source en --target es
+    python tm_io.py build-index
+"""
+
+import argparse
+import sys
+import xml.etree.ElementTree as ET
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+from config import Config
+from phrase_table import escape_field, unescape_field
+from translation_memory import Segment, TranslationMemory, language_matches, normalize_language
+
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Inline TMX elements whose content is native markup, not translatable text
+_TMX_CODE_TAGS = {"bpt", "ept", "it", "ph", "ut"}
+
+
+def _tuv_language(tuv: ET.Element) -> Optional[str]:
+    # TMX 1.4 uses xml:lang, TMX 1.1 used a plain lang attribute
+    language = tuv.get(XML_LANG) or tuv.get("lang")
+    return normalize_language(language) if language else None
+
+
+def _segment_text(element: ET.Element) -> str:
+    """Text of a <seg>, keeping <hi>/<sub> content and dropping inline codes"""
+    parts = [element.text or ""]
+    for child in element:
+        if child.tag not in _TMX_CODE_TAGS:
+            parts.append(_segment_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def read_tmx(
+    path: str,
+    source_lang: Optional[str] = None,
+    target_lang: Optional[str] = None
+) -> Iterator[Segment]:
+    """
+    Stream segment pairs from a TMX file
+
+    Each <tu> is discarded as soon as it has been read, so memory use stays
+    constant however large the file is.
+
+    Args:
+        path: TMX file path
+        source_lang: Source language to pair from; defaults to the srclang
+            of each <tu> or of the header. A bare code also matches regional
+            variants ("pt" pairs from "pt-BR")
+        target_lang: Only yield pairs into this language (variants included
+            for a bare code); defaults to every other language in the <tu>
+
+    Yields:
+        (source_lang, target_lang, source_text, target_text) tuples
+    """
+    source_filter = normalize_language(source_lang) if source_lang else None
+    target_filter = normalize_language(target_lang) if target_lang else None
+    header_source = None
+    body = None
+
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if element.tag == "body":
+                body = element
+            elif element.tag == "header":
+                srclang = element.get("srclang")
+                if srclang and srclang != "*all*":
+                    header_source = normalize_language(srclang)
+            continue
+
+        if element.tag != "tu":
+            continue
+
+        segments = {}
+        for tuv in element.iter("tuv"):
+            language = _tuv_language(tuv)
+            seg = tuv.find("seg")
+            if language and seg is not None and language not in segments:
+                segments[language] = _segment_text(seg)
+
+        tu_source = element.get("srclang")
+        if tu_source and tu_source != "*all*":
+            tu_source = normalize_language(tu_source)
+        else:
+            tu_source = header_source
+        if source_filter:
+            source = next((language for language in segments if language_matches(language, source_filter)), None)
+        else:
+            source = tu_source or next(iter(segments), None)
+
+        if source in segments:
+            for language, text in segments.items():
+                if language == source or (target_filter and not language_matches(language, target_filter)):
+                    continue
+                yield source, language, segments[source], text
+
+        # Detach finished units so the tree never grows past the current <tu>
+        element.clear()
+        if body is not None:
+            body.clear()
+
+
+def read_tsv(
+    path: str,
+    source_lang: str,
+    target_lang: str,
+    skip_header: bool = False
+) -> Iterator[Segment]:
+    """
+    Stream segment pairs from a two-column TSV file
+
+    Fields use the same backslash escapes as the phrase index
+    (\\t, \\n, \\\\), so multi-line segments round-trip.
+
+    Args:
+        path: TSV file path (source<TAB>target per line)
+        source_lang: Language of the first column
+        target_lang: Language of the second column
+        skip_header: Ignore the first line
+
+    Yields:
+        (source_lang, target_lang, source_text, target_text) tuples
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="\n") as handle:
+        if skip_header:
+            next(handle, None)
+        for line in handle:
+            fields = line.rstrip("\r\n").split("\t")
+            if len(fields) < 2:
+                continue
+            yield source_lang, target_lang, unescape_field(fields[0]), unescape_field(fields[1])
+
+
+def write_tmx(segments: Iterable[Segment], path: str) -> int:
+    """
+    Stream segment pairs out to a TMX 1.4 file
+
+    Args:
+        segments: (source_lang, target_lang, source_text, target_text) tuples
+        path: Destination file path
+
+    Returns:
+        Number of translation units written
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        handle.write('<tmx version="1.4">\n')
+        handle.write(
+            '  <header creationtool="TransLingua" creationtoolversion="1.0" '
+            'datatype="plaintext" segtype="sentence" adminlang="en" '
+            'srclang="*all*" o-tmf="TransLingua"/>\n'
+        )
+        handle.write("  <body>\n")
+        for source_lang, target_lang, source_text, target_text in segments:
+            handle.write(f"    <tu srclang={quoteattr(source_lang)}>\n")
+            handle.write(f"      <tuv xml:lang={quoteattr(source_lang)}><seg>{escape(source_text)}</seg></tuv>\n")
+            handle.write(f"      <tuv xml:lang={quoteattr(target_lang)}><seg>{escape(target_text)}</seg></tuv>\n")
+            handle.write("    </tu>\n")
+            count += 1
+        handle.write("  </body>\n")
+        handle.write("</tmx>\n")
+    return count
+
+
+def write_tsv(segments: Iterable[Segment], path: str) -> int:
+    """
+    Stream segment pairs out to a two-column TSV file
+
+    The file has no language columns, so all segments must belong to a
+    single (source, target) tag pair.
+
+    Args:
+        segments: (source_lang, target_lang, source_text, target_text) tuples
+        path: Destination file path
+
+    Returns:
+        Number of lines written
+
+    Raises:
+        ValueError: If the segments span more than one language pair
+    """
+    count = 0
+    pair = None
+    with open(path, "w", encoding="utf-8", newline="\n") as handle:
+        for source_lang, target_lang, source_text, target_text in segments:
+            if pair is None:
+                pair = (source_lang, target_lang)
+            elif pair != (source_lang, target_lang):
+                raise ValueError(
+                    f"TSV export mixes {pair[0]}->{pair[1]} with {source_lang}->{target_lang}"
+                )
+            handle.write(f"{escape_field(source_text)}\t{escape_field(target_text)}\n")
+            count += 1
+    return count
+
+
+def _report_progress(label: str) -> Callable[[int], None]:
+    def report(total: int):
+        print(f"   {label}: {total:,} segments", flush=True)
+    return report
+
+
+def _counting(segments: Iterable[Segment], report: Callable[[int], None]) -> Iterator[Segment]:
+    """Pass segments through, reporting progress every TM_BATCH_SIZE items"""
+    count = 0
+    for count, segment in enumerate(segments, 1):
+        yield segment
+        if count % Config.TM_BATCH_SIZE == 0:
+            report(count)
+    report(count)
+
+
+def _single_pair(memory: TranslationMemory, source_lang: str, target_lang: str) -> Tuple[str, str]:
+    """
+    Resolve the stored tag pair a two-column export refers to
+
+    A bare code such as "pt" would otherwise pull "pt-BR" and "pt-PT" into
+    the same file with nothing to tell them apart.
+
+    Raises:
+        ValueError: If more than one stored tag pair matches
+    """
+    pairs = memory.language_pairs(source_lang, target_lang)
+    if len(pairs) > 1:
+        listed = ", ".join(f"{source}->{target}" for source, target in pairs)
+        source, target = pairs[0]
+        raise ValueError(
+            f"{len(pairs)} language pairs match ({listed}); "
+            f"pass full tags, e.g. --source {source} --target {target}"
+        )
+    if pairs:
+        return pairs[0]
+    return normalize_language(source_lang), normalize_language(target_lang)
+
+
+def main(argv: Optional[Tuple[str, ...]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Import and export the TransLingua translation memory")
+    parser.add_argument("--db", default=Config.TRANSLATION_MEMORY_PATH, help="Translation memory database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, needs_pair in (
+        ("import-tmx", False),
+        ("import-tsv", True),
+        ("export-tmx", False),
+        ("export-tsv", True),
+    ):
+        command = commands.add_parser(name)
+        command.add_argument("path")
+        command.add_argument("--source", required=needs_pair, help="Source language name or code")
+        command.add_argument("--target", required=needs_pair, help="Target language name or code")
+        if name == "import-tsv":
+            command.add_argument("--skip-header", action="store_true")
+
+    build = commands.add_parser("build-index", help="Compile the memory into the offline phrase table")
+    build.add_argument("--output", default=Config.PHRASE_INDEX_PATH)
+
+    args = parser.parse_args(argv)
+    memory = TranslationMemory(args.db)
+
+    try:
+        if args.command == "import-tmx":
+            segments = read_tmx(args.path, args.source, args.target)
+            total = memory.add_many(segments, progress=_report_progress("Imported"))
+        elif args.command == "import-tsv":
+            segments = read_tsv(args.path, args.source, args.target, args.skip_header)
+            total = memory.add_many(segments, progress=_report_progress("Imported"))
+        elif args.command == "export-tmx":
+            segments = _counting(memory.iter_segments(args.source, args.target), _report_progress("Exported"))
+            total = write_tmx(segments, args.path)
+        elif args.command == "export-tsv":
+            source_lang, target_lang = _single_pair(memory, args.source, args.target)
+            segments = _counting(
+                memory.iter_segments(source_lang, target_lang, exact=True),
+                _report_progress("Exported")
+            )
+            total = write_tsv(segments, args.path)
+        else:
+            total = memory.compile_phrase_index(args.output)
+    except Exception as e:
+        print(f"❌ {args.command} failed: {str(e)}")
+        return 1
+    finally:
+        memory.close()
+
+    print(f"✅ {args.command}: {total:,} segments")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Translation memory store for TransLingua application
+Persists segment pairs in SQLite, indexed by language pair and source segment
+"""
+
+import sqlite3
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from config import Config
+from phrase_table import normalize_segment, write_phrase_index
+
+Segment = Tuple[str, str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    source_key TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    target_text TEXT NOT NULL,
+    PRIMARY KEY (source_lang, target_lang, source_key)
+) WITHOUT ROWID
+"""
+
+_UPSERT = """
+INSERT OR REPLACE INTO segments
+    (source_lang, target_lang, source_key, source_text, target_text)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def normalize_language(language: str) -> str:
+    """
+    Normalize a language name or tag to a canonical language tag
+
+    Names map to the codes used in Config.LANGUAGES. Region and script
+    subtags are kept, so "zh-TW" and "zh-CN" or "pt-BR" and "pt-PT" stay
+    distinct in the store; see primary_language for the UI code.
+
+    Args:
+        language: Language name ("English") or tag ("en", "en_US", "EN-us")
+
+    Returns:
+        Tag with a lower-case language, title-case script and upper-case
+        region subtag, e.g. "en-US" or "zh-Hant-TW"
+    """
+    code = Config.language_code(language.strip()).replace("_", "-")
+    subtags = [subtag for subtag in code.split("-") if subtag]
+    if not subtags:
+        return ""
+    tag = [subtags[0].lower()]
+    for subtag in subtags[1:]:
+        if len(subtag) == 2 and subtag.isalpha():
+            tag.append(subtag.upper())
+        elif len(subtag) == 4 and subtag.isalpha():
+            tag.append(subtag.title())
+        else:
+            tag.append(subtag.lower())
+    return "-".join(tag)
+
+
+def primary_language(language: str) -> str:
+    """
+    Primary language code of a name or tag ("pt-BR" -> "pt")
+
+    This is the granularity of Config.LANGUAGES and of the phrase index.
+    """
+    return normalize_language(language).split("-")[0]
+
+
+def language_matches(tag: str, language: str) -> bool:
+    """
+    Whether a stored tag falls under a requested language
+
+    A bare code ("zh") matches itself and all of its regional variants;
+    a full tag ("zh-TW") matches only itself.
+    """
+    tag, wanted = normalize_language(tag), normalize_language(language)
+    return tag == wanted or ("-" not in wanted and tag.startswith(wanted + "-"))
+
+
+def _language_clause(column: str, language: str, exact: bool = False) -> Tuple[str, tuple]:
+    """SQL condition implementing language_matches (or tag equality) on a tag column"""
+    wanted = normalize_language(language)
+    if exact or "-" in wanted:
+        return f"{column} = ?", (wanted,)
+    # Variants sort between "zh-" and "zh." ("." follows "-"), which keeps
+    # the condition on the primary key index
+    return f"({column} = ? OR ({column} > ? AND {column} < ?))", (wanted, wanted + "-", wanted + ".")
+
+
+def _primary_sql(column: str) -> str:
+    return f"CASE WHEN instr({column}, '-') THEN substr({column}, 1, instr({column}, '-') - 1) ELSE {column} END"
+
+
+class TranslationMemory:
+    """SQLite-backed store of translated segment pairs"""
+
+    def __init__(self, path: str = Config.TRANSLATION_MEMORY_PATH):
+        """
+        Open (or create) a translation memory database
+
+        Args:
+            path: SQLite database path
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Streamlit reruns the script on different threads, so the
+        # connection is shared and serialized with our own lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row(source_lang: str, target_lang: str, source_text: str, target_text: str):
+        key = normalize_segment(source_text)
+        if not key or not target_text.strip():
+            return None
+        return (
+            normalize_language(source_lang),
+            normalize_language(target_lang),
+            key,
+            source_text,
+            target_text
+        )
+
+    def add(self, source_lang: str, target_lang: str, source_text: str, target_text: str):
+        """
+        Store a single segment pair, replacing any previous translation
+
+        Args:
+            source_lang: Source language name or code
+            target_lang: Target language name or code
+            source_text: Source segment
+            target_text: Translated segment
+        """
+        row = self._row(source_lang, target_lang, source_text, target_text)
+        if row is None:
+            return
+        with self._lock:
+            self._conn.execute(_UPSERT, row)
+            self._conn.commit()
+
+    def add_many(
+        self,
+        segments: Iterable[Segment],
+        batch_size: int = Config.TM_BATCH_SIZE,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Bulk-load segment pairs in batched transactions
+
+        The input is consumed lazily, so memory use is bounded by the batch
+        size regardless of how many segments the iterable yields.
+
+        Args:
+            segments: (source_lang, target_lang, source_text, target_text) tuples
+            batch_size: Number of rows written per transaction
+            progress: Optional callback receiving the running total after each batch
+
+        Returns:
+            Number of segments written
+        """
+        total = 0
+        batch = []
+        for segment in segments:
+            row = self._row(*segment)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += self._write_batch(batch)
+                batch = []
+                if progress:
+                    progress(total)
+
+        if batch:
+            total += self._write_batch(batch)
+            if progress:
+                progress(total)
+        return total
+
+    def _write_batch(self, batch: List[tuple]) -> int:
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(_UPSERT, batch)
+        return len(batch)
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Find a stored translation for an exact (normalized) source segment
+
+        A bare language code also matches segments stored under its regional
+        variants; a segment stored under exactly the requested tags wins.
+
+        Returns:
+            Stored translation, or None on a miss
+        """
+        key = normalize_segment(text)
+        if not key:
+            return None
+        source_clause, source_params = _language_clause("source_lang", source_lang)
+        target_clause, target_params = _language_clause("target_lang", target_lang)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT target_text FROM segments "
+                f"WHERE {source_clause} AND {target_clause} AND source_key = ? "
+                f"ORDER BY source_lang != ?, target_lang != ?, source_lang, target_lang LIMIT 1",
+                source_params + target_params + (
+                    key, normalize_language(source_lang), normalize_language(target_lang)
+                )
+            ).fetchone()
+        return row[0] if row else None
+
+    def language_pairs(
+        self,
+        source_lang: Optional[str] = None,
+        target_lang: Optional[str] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        List the language pairs present in the store
+
+        Args:
+            source_lang: Optional source language filter; a bare code
+                includes its regional variants
+            target_lang: Optional target language filter, likewise
+
+        Returns:
+            Sorted (source_lang, target_lang) tag pairs
+        """
+        query, params = self._filtered(
+            "SELECT DISTINCT source_lang, target_lang FROM segments",
+            source_lang,
+            target_lang,
+            order_by="source_lang, target_lang"
+        )
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def iter_segments(
+        self,
+        source_lang: Optional[str] = None,
+        target_lang: Optional[str] = None,
+        exact: bool = False
+    ) -> Iterator[Segment]:
+        """
+        Stream stored segment pairs in index order
+
+        Rows are fetched in chunks from a dedicated cursor, so exporting a
+        large memory does not load it all at once.
+
+        Args:
+            source_lang: Optional source language filter; a bare code
+                includes its regional variants
+            target_lang: Optional target language filter, likewise
+            exact: Match the given tags exactly, without regional variants
+
+        Yields:
+            (source_lang, target_lang, source_text, target_text) tuples
+        """
+        query, params = self._filtered(
+            "SELECT source_lang, target_lang, source_text, target_text FROM segments",
+            source_lang,
+            target_lang,
+            exact
+        )
+        yield from self._stream(query, params)
+
+    def count(self, source_lang: Optional[str] = None, target_lang: Optional[str] = None) -> int:
+        """Number of stored segment pairs, optionally for one language pair"""
+        query, params = self._filtered("SELECT COUNT(*) FROM segments", source_lang, target_lang)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def compile_phrase_index(self, path: str = Config.PHRASE_INDEX_PATH) -> int:
+        """
+        Write the whole memory out as a memory-mapped phrase index
+
+        The index is keyed by primary language codes, as offered in the UI.
+        Where regional variants hold the same segment, the one stored under
+        the bare code wins, then the first variant in tag order.
+
+        Args:
+            path: Destination index path
+
+        Returns:
+            Number of records written
+        """
+        source_primary = _primary_sql("source_lang")
+        target_primary = _primary_sql("target_lang")
+        rows = self._stream(
+            f"SELECT {source_primary}, {target_primary}, source_key, target_text FROM segments "
+            f"ORDER BY 1, 2, source_key, source_lang, target_lang",
+            ()
+        )
+        return write_phrase_index(self._first_per_key(rows), path)
+
+    @staticmethod
+    def _first_per_key(rows: Iterable[tuple]) -> Iterator[tuple]:
+        previous = None
+        for row in rows:
+            if row[:3] != previous:
+                previous = row[:3]
+                yield row
+
+    @staticmethod
+    def _filtered(
+        query: str,
+        source_lang: Optional[str],
+        target_lang: Optional[str],
+        exact: bool = False,
+        order_by: str = "source_lang, target_lang, source_key"
+    ):
+        clauses, params = [], ()
+        for column, language in (("source_lang", source_lang), ("target_lang", target_lang)):
+            if language:
+                clause, clause_params = _language_clause(column, language, exact)
+                clauses.append(clause)
+                params += clause_params
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return f"{query} ORDER BY {order_by}", params
+
+    def _stream(self, query: str, params: tuple) -> Iterator[tuple]:
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(Config.TM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
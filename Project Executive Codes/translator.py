@@ -3,11 +3,26 @@ Translation module for TransLingua application
 Demonstrates Google GenAI API setup and pre-trained model initialization
 """
 
+import json
 import os
-import google.genai as genai
+import re
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from config import Config
+from cassette import create_client
+from concurrency import BULK, AdaptiveLimiter
+from context_cache import ContextCache
+from hedging import HedgingPolicy
+from backends import (
+    ChainBackend,
+    GeminiBackend,
+    MemoryWriteBackend,
+    PhraseTableBackend,
+    TranslationBackend,
+    TranslationMemoryBackend
+)
+from phrase_table import PhraseIndex
+from translation_memory import TranslationMemory
 
 class Translator:
     """Translation service using Google GenAI LLM - New API Implementation"""
@@ -20,34 +35,94 @@ class Translator:
             
             # Step 2: Get API key
             self.api_key = os.getenv("GOOGLE_API_KEY")
-            if not self.api_key:
+            if not self.api_key and Config.CASSETTE_MODE != "replay":
                 raise ValueError("GOOGLE_API_KEY not found in environment variables")
             
-            # Step 3: Initialize client
-            self.client = genai.Client(api_key=self.api_key)
+            # Step 3: Initialize client (or the record/replay stand-in)
+            self.client = create_client(self.api_key)
             
             # Step 4: Set model name
             self.model_name = Config.MODEL_NAME
             
+            # Step 5: Build the backend chain (local phrase table first, LLM on a miss)
+            self.hedging = HedgingPolicy() if Config.HEDGING_ENABLED else None
+            self.limiter = AdaptiveLimiter()
+            self.llm = GeminiBackend(self.client, self.model_name, self.hedging, self.limiter)
+            # Local hits would never reach the model, so a recording would
+            # miss those calls and a replay could answer from stale local data;
+            # with a cassette every answer goes through it
+            use_local = Config.CASSETTE_MODE not in ("record", "replay")
+            self.phrase_index = PhraseIndex.open(Config.PHRASE_INDEX_PATH) if use_local else None
+            self.memory = (
+                TranslationMemory(Config.TRANSLATION_MEMORY_PATH)
+                if Config.TRANSLATION_MEMORY_PATH and use_local else None
+            )
+            self.backend = self._build_backend_chain()
+            # Similar segments are only offered as suggestions when translation fails
+            self.suggestions = (
+                PhraseTableBackend(self.phrase_index, Config.SUGGESTION_MATCH_THRESHOLD)
+                if self.phrase_index else None
+            )
+            self.context_cache = ContextCache(self.client, self.model_name)
+            
             print("✅ Google GenAI API configured successfully")
             print("✅ Pre-trained models initialized:")
             print(f"   - Translation model: {Config.MODEL_NAME}")
             print(f"   - Travel guide model: {Config.MODEL_NAME}")
+            if self.phrase_index:
+                print(f"   - Phrase table: {Config.PHRASE_INDEX_PATH}")
+            if self.memory:
+                print(f"   - Translation memory: {Config.TRANSLATION_MEMORY_PATH}")
+            if Config.CASSETTE_MODE:
+                print(f"   - Cassette ({Config.CASSETTE_MODE}): {Config.CASSETTE_PATH}")
+            if self.hedging:
+                print(f"   - Request hedging: after p{Config.HEDGE_PERCENTILE}, budget {Config.HEDGE_BUDGET_PERCENT}%")
             
         except Exception as e:
             raise Exception(f"Failed to initialize Google GenAI API and models: {str(e)}")
     
+    def _build_backend_chain(self) -> TranslationBackend:
+        """
+        Assemble the translation backend chain
+        
+        Exact phrase-table and translation-memory hits are served locally; anything else escalates to the LLM, whose
+        answers are recorded in the memory.
+        """
+        llm = MemoryWriteBackend(self.llm, self.memory) if self.memory else self.llm
+        if not self.phrase_index and not self.memory:
+            return llm
+        
+        backends = []
+        if self.phrase_index:
+            backends.append(PhraseTableBackend(self.phrase_index))
+        if self.memory:
+            backends.append(TranslationMemoryBackend(self.memory))
+        backends.append(llm)
+        return ChainBackend(backends)
+    
     def get_model_info(self) -> Dict[str, str]:
         """
         Get information about initialized models
         """
         return {
             "api_status": "configured" if self.api_key else "not configured",
+            "cassette_mode": Config.CASSETTE_MODE or "off",
             "translation_model": Config.MODEL_NAME,
             "travel_model": Config.MODEL_NAME,
+            "phrase_table": Config.PHRASE_INDEX_PATH if self.phrase_index else "not loaded",
+            "translation_memory": Config.TRANSLATION_MEMORY_PATH if self.memory else "disabled",
             "api_key_prefix": self.api_key[:10] + "..." if self.api_key else "None"
         }
     
+    def get_concurrency_metrics(self) -> Dict[str, object]:
+        """
+        Get the adaptive concurrency limiter state
+        
+        Returns:
+            Current limit, in-flight and queued calls per lane, latency averages
+        """
+        return self.limiter.metrics()
+    
     def translate_text(
         self, 
         text: str, 
@@ -65,42 +140,79 @@ class Translator:
             context: Optional context for better translation
             
         Returns:
-            Translated text
+            Translated text, or an error message that may carry the
+            translation of a similar stored segment as a suggestion
         """
         if not text.strip():
             return ""
         
-        # Build translation prompt
-        base_prompt = f"""
-        Translate the following text from {source_lang} to {target_lang}.
-        Provide only the translation without any additional explanations or formatting.
-        Maintain the original tone, style, and context of the text.
-        
-        Text to translate: {text}
+        try:
+            translated_text = self.backend.translate(text, source_lang, target_lang, context)
+            if translated_text is not None:
+                return translated_text
+            error = "Translation Error: no backend could translate the text"
+        except Exception as e:
+            error = f"Translation Error: {str(e)}"
         
-        Translation:
+        # A similar segment's translation is not a translation of this text,
+        # so it is only ever shown labelled as a suggestion
+        match = self.suggestions.closest_match(text, source_lang, target_lang) if self.suggestions else None
+        if match:
+            suggestion, similarity = match
+            error += f"\n\nSuggestion from a {similarity:.0%} similar stored segment (review before use):\n{suggestion}"
+        return error
+    
+    def translate_batch(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        context: Optional[str] = None
+    ) -> List[str]:
         """
+        Translate several short strings in a single model call
+        
+        Unlike translate_text, failures raise instead of returning an error
+        string, so bulk callers never mistake an error for a translation.
         
-        if context:
-            base_prompt = f"""
-            Translate the following text from {source_lang} to {target_lang}.
-            Context: {context}
-            Provide only the translation without any additional explanations or formatting.
-            Maintain the original tone, style, and context of the text.
+        Args:
+            texts: Strings to translate
+            source_lang: Source language name
+            target_lang: Target language name
+            context: Optional context for better translation
             
-            Text to translate: {text}
+        Returns:
+            Translations in the same order as texts
             
-            Translation:
-            """
+        Raises:
+            ValueError: If the response is not a matching JSON array
+        """
+        if not texts:
+            return []
         
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=base_prompt
-            )
-            return response.text.strip()
-        except Exception as e:
-            return f"Translation Error: {str(e)}"
+        prompt = f"""
+        Translate each string in the following JSON array from {source_lang} to {target_lang}.
+        {f'Context: {context}' if context else ''}
+        Respond with only a JSON array of the translated strings, in the same order
+        and with the same number of items, without any additional explanations or formatting.
+        Maintain the original tone, style, and context of each string.
+        
+        Strings: {json.dumps(texts, ensure_ascii=False)}
+        """
+        
+        response = self.llm.generate(prompt, method="translate_batch", lane=BULK)
+        response = response.strip()
+        if response.startswith("```"):
+            response = response.strip("`").split("\n", 1)[-1]
+        
+        translations = json.loads(response)
+        if (
+            not isinstance(translations, list)
+            or len(translations) != len(texts)
+            or not all(isinstance(item, str) for item in translations)
+        ):
+            raise ValueError(f"Expected a JSON array of {len(texts)} strings from the model")
+        return [item.strip() for item in translations]
     
     def generate_travel_guide(self, destination: str, duration: str, interests: str, budget: str = "") -> str:
         """
@@ -135,11 +247,7 @@ class Translator:
         """
         
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            return response.text.strip()
+            return self.llm.generate(prompt, method="generate_travel_guide")
         except Exception as e:
             return f"Travel Guide Generation Error: {str(e)}"
     
@@ -163,8 +271,7 @@ class Translator:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return self.llm.generate(prompt, method="detect_language")
         except Exception as e:
             return f"Detection Error: {str(e)}"
     
@@ -194,18 +301,170 @@ class Translator:
         Returns:
             Refined translation
         """
-        prompt = f"""
-        Refine the following translation based on the provided feedback.
+        instructions = """
+        Refine translations based on the provided feedback.
+        Provide only the refined translation without any additional explanations or formatting.
+        """
+        
+        try:
+            # The original text is the part every feedback round shares, so
+            # long originals are cached once and reused across rounds
+            with self.context_cache.lease(f"Original text: {original_text}", instructions) as cache_name:
+                if cache_name:
+                    prompt = f"""
+                    Current translation: {translated_text}
+                    Feedback: {feedback}
+                    
+                    Provide only the refined translation:
+                    """
+                else:
+                    prompt = f"""
+                    Refine the following translation based on the provided feedback.
+                    
+                    Original text: {original_text}
+                    Current translation: {translated_text}
+                    Feedback: {feedback}
+                    
+                    Provide only the refined translation:
+                    """
+                return self.llm.generate(prompt, cached_content=cache_name, method="refine_translation")
+        except Exception as e:
+            return f"Refinement Error: {str(e)}"
+    
+    def translate_document(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        glossary: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Translate a long document chunk by chunk
+        
+        The instructions, glossary and full document are cached upstream
+        once, so each chunk request only sends the chunk itself while the
+        model still sees the whole document for context.
         
-        Original text: {original_text}
-        Current translation: {translated_text}
-        Feedback: {feedback}
+        Args:
+            text: Document text
+            source_lang: Source language name
+            target_lang: Target language name
+            glossary: Optional mapping of source terms to required translations
+            
+        Returns:
+            Translated document
+        """
+        chunks = _split_into_chunks(text, Config.DOCUMENT_CHUNK_CHARS)
+        if not chunks:
+            return ""
+        if len(chunks) == 1:
+            context = _format_glossary(glossary) if glossary else None
+            return self.translate_text(text, source_lang, target_lang, context)
         
-        Provide only the refined translation:
+        instructions = f"""
+        You translate documents from {source_lang} to {target_lang}.
+        Provide only the translation without any additional explanations or formatting.
+        Maintain the original tone, style, and context of the text.
+        Always use the glossary translations for the listed terms.
         """
+        glossary_text = _format_glossary(glossary) if glossary else "Glossary: (none)"
+        shared = f"{glossary_text}\n\nFull document:\n{text}"
         
+        translated = []
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            with self.context_cache.lease(shared, instructions) as cache_name:
+                for number, (separator, chunk) in enumerate(chunks, 1):
+                    if cache_name:
+                        self.context_cache.keep_alive(cache_name)
+                        prompt = f"""
+                        Translate part {number} of {len(chunks)} of the document above.
+                        
+                        Part {number}:
+                        {chunk}
+                        """
+                    else:
+                        prompt = f"""
+                        {instructions}
+                        {glossary_text}
+                        
+                        Text to translate: {chunk}
+                        
+                        Translation:
+                        """
+                    translated.append(
+                        separator + self.llm.generate(
+                            prompt, cached_content=cache_name, method="translate_document", lane=BULK
+                        )
+                    )
         except Exception as e:
-            return f"Refinement Error: {str(e)}"
+            return f"Translation Error: {str(e)}"
+        
+        # Rejoin with the whitespace each split actually consumed
+        return "".join(translated)
+
+
+def _format_glossary(glossary: Dict[str, str]) -> str:
+    """Render a glossary as prompt text"""
+    lines = [f"- {term} → {translation}" for term, translation in glossary.items()]
+    return "Glossary:\n" + "\n".join(lines)
+
+
+# Boundaries tried in order when a piece of text is too long for one chunk;
+# each takes the whole surrounding whitespace run so no unit is blank
+_CHUNK_BOUNDARIES = (
+    re.compile(r"(\s*\n\s*\n\s*)"),
+    re.compile(r"(\s*\n\s*)"),
+    re.compile(r"(?<=[.!?;。！？；])(\s+)"),
+    re.compile(r"(\s+)")
+)
+
+
+def _split_units(text: str, max_chars: int, level: int = 0) -> List[str]:
+    """
+    Split text into [unit, separator, unit, ...] with no unit over max_chars
+
+    Paragraph breaks are preferred, then line breaks, sentence ends and any
+    whitespace; only a single word longer than max_chars is cut inside.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    if level == len(_CHUNK_BOUNDARIES):
+        units = [text[:max_chars]]
+        for i in range(max_chars, len(text), max_chars):
+            units += ["", text[i:i + max_chars]]
+        return units
+
+    units = []
+    for i, part in enumerate(_CHUNK_BOUNDARIES[level].split(text)):
+        if i % 2:
+            units.append(part)
+        else:
+            units += _split_units(part, max_chars, level + 1)
+    return units
+
+
+def _split_into_chunks(text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """
+    Split text into chunks of at most max_chars at natural boundaries
+
+    Returns:
+        (separator, chunk) pairs, where separator is the original text that
+        preceded the chunk ("" for the first), so joining them rebuilds the
+        stripped input exactly
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    units = _split_units(text, max_chars)
+    chunks = []
+    separator, current = "", units[0]
+    for i in range(1, len(units), 2):
+        gap, unit = units[i], units[i + 1]
+        if len(current) + len(gap) + len(unit) <= max_chars:
+            current += gap + unit
+        else:
+            chunks.append((separator, current))
+            separator, current = gap, unit
+    chunks.append((separator, current))
+    return chunks